@@ -7,16 +7,23 @@
 
 import os
 import sys
+import signal
 import json
 import logging
 import asyncio
 import re
 import random
+import hashlib
+import shutil
 import yaml
 import html
 from datetime import datetime, timedelta, timezone, time
-from typing import Optional, Dict, List, Any, Tuple
-from collections import defaultdict, deque
+from typing import Optional, Dict, List, Any, Tuple, NamedTuple
+from types import MappingProxyType
+from time import monotonic, perf_counter_ns
+from collections import defaultdict, deque, OrderedDict
+import heapq
+import math
 import threading
 import pytz
 import httpx
@@ -31,7 +38,7 @@ from telegram.ext import (
     Application, CommandHandler, MessageHandler, CallbackQueryHandler, ContextTypes, filters
 )
 from telegram.constants import ParseMode, ChatAction, ChatMemberStatus
-from telegram.error import BadRequest, Forbidden, RetryAfter
+from telegram.error import BadRequest, Forbidden, RetryAfter, TimedOut, NetworkError
 
 from openai import AsyncOpenAI
 
@@ -40,11 +47,16 @@ from openai import AsyncOpenAI
 # ============================================================================
 
 class CharacterCard:
-    """SillyTavern-style character definition - Formal & Mature Personality"""
+    """SillyTavern-style character definition - Formal & Mature Personality
     
-    def __init__(self, card_path: str = "kavya_card.yaml"):
+    Instances are immutable snapshots; get them from `character_cards`
+    instead of constructing one per consumer.
+    """
+    
+    def __init__(self, card_path: str = "kavya_card.yaml", version: Optional[float] = None):
         self.card_path = card_path
-        self.data = self._load_card()
+        self.version = version  # File mtime this snapshot was parsed from
+        self.data = MappingProxyType(self._load_card())
         self.name = self.data.get('name', 'Kavya')
         self.description = self.data.get('description', '')
         self.personality = self.data.get('personality', '')
@@ -52,7 +64,12 @@ class CharacterCard:
         self.first_mes = self.data.get('first_mes', '')
         self.mes_example = self.data.get('mes_example', '')
         self.creatorcomment = self.data.get('creatorcomment', '')
-        
+        self._frozen = True
+    
+    def __setattr__(self, key, value):
+        if getattr(self, '_frozen', False):
+            raise AttributeError("CharacterCard snapshots are immutable")
+        super().__setattr__(key, value)
         
     def _load_card(self) -> Dict:
         """Load character card from YAML"""
@@ -91,21 +108,148 @@ Personality traits:
         try:
             with open(self.card_path, 'r', encoding='utf-8') as f:
                 loaded = yaml.safe_load(f)
-                if loaded:
+                if isinstance(loaded, dict):
                     default_card.update(loaded)
-        except:
-            # Create default card if not exists
-            with open(self.card_path, 'w', encoding='utf-8') as f:
-                yaml.dump(default_card, f, allow_unicode=True)
+        except FileNotFoundError:
+            # Built-in defaults; never write files at startup
+            pass
+        except Exception as e:
+            logger.warning(f"⚠️ Character card load error ({self.card_path}): {e}")
         
         return default_card
 
 
+class CharacterCardRegistry:
+    """Process-wide card cache: one YAML parse per file version (mtime)"""
+    
+    def __init__(self):
+        self._cards: Dict[str, CharacterCard] = {}
+        self._checked_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _mtime(card_path: str) -> Optional[float]:
+        try:
+            return os.stat(card_path).st_mtime
+        except OSError:
+            return None
+    
+    def get(self, card_path: str = "kavya_card.yaml") -> CharacterCard:
+        """Current snapshot for a card file, reloaded only if its mtime changed"""
+        card = self._cards.get(card_path)
+        now = monotonic()
+        if card is not None and now - self._checked_at.get(card_path, 0) < Config.CARD_RELOAD_CHECK_SECONDS:
+            return card
+        
+        with self._lock:
+            self._checked_at[card_path] = now
+            mtime = self._mtime(card_path)
+            card = self._cards.get(card_path)
+            if card is None or card.version != mtime:
+                card = CharacterCard(card_path, version=mtime)
+                if card_path in self._cards:
+                    logger.info(f"🃏 Character card reloaded: {card_path}")
+                self._cards[card_path] = card
+            return card
+
+
+character_cards = CharacterCardRegistry()
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over lorebook keys
+    
+    All keys of all entries are compiled into one automaton, so matching is
+    linear in the message length no matter how many entries exist. Keys only
+    match on word boundaries; matched entries are ordered by priority
+    (higher first), then by where they first appear in the message.
+    """
+    
+    def __init__(self, entries: List[Dict]):
+        self.entries = entries
+        self.priorities = [self._priority(e) for e in entries]
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, int]]] = [[]]  # (entry index, key length)
+        
+        for idx, entry in enumerate(entries):
+            for key in self._keys(entry):
+                self._insert(key, idx)
+        self._build_failure_links()
+    
+    @staticmethod
+    def _keys(entry: Dict) -> List[str]:
+        keys = entry.get('keys') or []
+        if isinstance(keys, str):
+            keys = keys.split(',')
+        return [k.strip().lower() for k in keys if isinstance(k, str) and k.strip()]
+    
+    @staticmethod
+    def _priority(entry: Dict) -> int:
+        try:
+            return int(entry.get('priority') or 0)
+        except (TypeError, ValueError):
+            return 0
+    
+    def _insert(self, key: str, idx: int):
+        node = 0
+        for ch in key:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                nxt = len(self._goto) - 1
+                self._goto[node][ch] = nxt
+            node = nxt
+        self._out[node].append((idx, len(key)))
+    
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+    
+    def match(self, message: str) -> List[int]:
+        """Indices of matching entries, best first"""
+        text = message.lower()
+        n = len(text)
+        goto, fail, out = self._goto, self._fail, self._out
+        found: Dict[int, int] = {}
+        node = 0
+        
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            
+            for idx, length in out[node]:
+                if idx in found:
+                    continue
+                start = i - length + 1
+                if start > 0 and (text[start - 1].isalnum() or text[start - 1] == '_'):
+                    continue
+                if i + 1 < n and (text[i + 1].isalnum() or text[i + 1] == '_'):
+                    continue
+                found[idx] = start
+        
+        return sorted(found, key=lambda idx: (-self.priorities[idx], found[idx]))
+
+
 class WorldInfo:
     """SillyTavern-style Lorebook / World Info - Adjusted for Kavya"""
     
-    def __init__(self):
-        self.entries = self._load_world_info()
+    MAX_ENTRIES = 2  # Max entries per message to avoid prompt bloat
+    
+    def __init__(self, entries: List[Dict] = None):
+        self.entries = entries if entries is not None else self._load_world_info()
+        self.matcher = KeywordMatcher(self.entries)
     
     def _load_world_info(self) -> List[Dict]:
         """Load world info entries - these inject memory when keywords match"""
@@ -134,81 +278,308 @@ class WorldInfo:
     
     def get_relevant_info(self, message: str) -> str:
         """Extract relevant world info based on keywords"""
-        message_lower = message.lower()
-        relevant = []
-        
-        for entry in self.entries:
-            if any(key in message_lower for key in entry['keys']):
-                relevant.append(entry['content'])
-        
-        return " ".join(relevant[:2])  # Max 2 entries to avoid prompt bloat
+        matched = self.matcher.match(message)[:self.MAX_ENTRIES]
+        return " ".join(self.entries[i].get('content', '') for i in matched)
+
+
+class TokenEstimator:
+    """Fast local token estimate (no tokenizer download, no network)"""
+    
+    MESSAGE_OVERHEAD = 4  # role/separator tokens per chat message
+    
+    @staticmethod
+    def estimate(text: str) -> int:
+        """~4 ASCII chars per token; non-ASCII (Devanagari, emoji) ~1 token per char"""
+        if not text:
+            return 0
+        ascii_len = len(text.encode('ascii', 'ignore'))
+        return (ascii_len + 3) // 4 + (len(text) - ascii_len)
+    
+    @classmethod
+    def estimate_message(cls, message: Dict) -> int:
+        return cls.estimate(message.get('content', '')) + cls.MESSAGE_OVERHEAD
+    
+    @classmethod
+    def estimate_messages(cls, messages: List[Dict]) -> int:
+        return sum(cls.estimate_message(m) for m in messages)
+    
+    @classmethod
+    def truncate(cls, text: str, max_tokens: int) -> str:
+        """Cut text down to roughly max_tokens, on a word boundary"""
+        if cls.estimate(text) <= max_tokens:
+            return text
+        ratio = max_tokens / max(cls.estimate(text), 1)
+        cut = text[:max(int(len(text) * ratio), 1)]
+        if ' ' in cut:
+            cut = cut.rsplit(' ', 1)[0]
+        return cut + "…"
+
+
+class ResponsePipeline:
+    """Table-driven LLM output post-processing (all regexes precompiled)
+    
+    Each profile is an ordered tuple of step names; every step maps a list
+    of parts to a new list of parts. `reply` is used for chat answers,
+    `single` for one-piece content (shayari, Geeta quotes, diary).
+    """
+    
+    PROFILES = {
+        'reply': ('strip_prefix', 'split', 'placeholders', 'drop_short', 'limit'),
+        'single': ('strip_prefix', 'placeholders', 'strip_quotes', 'drop_short'),
+    }
+    
+    MOOD_EMOJIS = {
+        'composed': '🌸',
+        'thoughtful': '📝',
+        'reflective': '✨',
+        'calm': '🍃',
+        'stern': '⚡',
+        'gentle': '🌿'
+    }
+    
+    MAX_PARTS = 3
+    _PLACEHOLDER_RE = re.compile(r'\{\{\w+\}\}')
+    _QUOTES_RE = re.compile(r'^["“”\']+|["“”\']+$')
+    _EMOJI_RE = re.compile('[\U0001F300-\U0001FAFF\u2600-\u27BF\u2B50\u2728]')
+    
+    def __init__(self):
+        self._prefix_res: Dict[str, re.Pattern] = {}
+        self.calls = 0
+        self.total_ns = 0
+    
+    def _prefix_re(self, char_name: str) -> re.Pattern:
+        """Compiled 'assistant:' / '{{char}}:' / '<Name>:' stripper, cached per name"""
+        pattern = self._prefix_res.get(char_name)
+        if pattern is None:
+            pattern = re.compile(
+                rf'^\s*(?:assistant|\{{\{{char\}}\}}|{re.escape(char_name)})\s*:\s*', re.IGNORECASE
+            )
+            self._prefix_res[char_name] = pattern
+        return pattern
+    
+    # ----- steps -----
+    
+    def _step_strip_prefix(self, parts, ctx):
+        pattern = self._prefix_re(ctx['char_name'])
+        return [pattern.sub('', p, count=1) for p in parts]
+    
+    def _step_split(self, parts, ctx):
+        return [piece for p in parts for piece in p.split('|||')]
+    
+    def _step_placeholders(self, parts, ctx):
+        out = []
+        for p in parts:
+            p = p.strip().replace('{{user}}', ctx['user_name']).replace('{{char}}', ctx['char_name'])
+            out.append(self._PLACEHOLDER_RE.sub('', p).strip())
+        return out
+    
+    def _step_strip_quotes(self, parts, ctx):
+        return [self._QUOTES_RE.sub('', p.strip()).strip() for p in parts]
+    
+    def _step_drop_short(self, parts, ctx):
+        return [p for p in parts if p and len(p) > 2]
+    
+    def _step_limit(self, parts, ctx):
+        return parts[:self.MAX_PARTS]
+    
+    # ----- entry points -----
+    
+    def run(self, raw: str, profile: str = 'reply', user_name: str = 'User',
+            char_name: str = 'Kavya') -> List[str]:
+        """Run a profile over raw LLM output"""
+        if not raw:
+            return []
+        start = perf_counter_ns()
+        ctx = {'user_name': user_name, 'char_name': char_name}
+        parts = [raw]
+        for step in self.PROFILES[profile]:
+            parts = getattr(self, f"_step_{step}")(parts, ctx)
+        self.calls += 1
+        self.total_ns += perf_counter_ns() - start
+        return parts
+    
+    def clean(self, raw: Optional[str], user_name: str = 'User', char_name: str = 'Kavya') -> Optional[str]:
+        """Clean one-piece content; None if nothing usable is left"""
+        parts = self.run(raw, 'single', user_name, char_name) if raw else []
+        return parts[0] if parts else None
+    
+    def has_emoji(self, text: str) -> bool:
+        return self._EMOJI_RE.search(text) is not None
+    
+    def decorate(self, parts: List[str], mood: str, chance: float = 0.4) -> List[str]:
+        """Append the mood emoji to parts without one (with some probability)"""
+        emoji = self.MOOD_EMOJIS.get(mood, '🌸')
+        return [
+            f"{p} {emoji}" if not self.has_emoji(p) and random.random() < chance else p
+            for p in parts
+        ]
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'calls': self.calls,
+            'avg_us': round(self.total_ns / self.calls / 1000, 1) if self.calls else 0.0
+        }
+
+
+response_pipeline = ResponsePipeline()
+
+
+class CompiledPrefix(NamedTuple):
+    """Card-derived prompt prefix, compiled once per CharacterCard version"""
+    version: Tuple
+    messages: Tuple[MappingProxyType, ...]
 
 
 class PromptBuilder:
     """Builds SillyTavern-style prompts - Formal Tone"""
     
-    def __init__(self):
-        self.character = CharacterCard()
+    def __init__(self, card_path: str = "kavya_card.yaml"):
+        self.card_path = card_path
         self.world_info = WorldInfo()
         self.jailbreak = "System: You are in a roleplay. Stay in character. Use formal Hinglish (respectful 'aap'). Be composed, thoughtful, and mature. Avoid slang and excessive emojis. Keep responses concise but meaningful."
         self.authors_note = "[Kavya is chatting on Telegram. Keep responses formal yet warm. Maximum 2-3 lines. Use minimal emojis, only when appropriate.]"
+        self._prefix: Optional[CompiledPrefix] = None
     
-    def build_prompt(self, user_name: str, chat_history: List[Dict], current_message: str, 
-                     mood: str, time_period: str, memories: List[str] = None) -> List[Dict]:
-        """Build the complete prompt SillyTavern-style"""
-        
-        # System prompt with character description
+    @property
+    def character(self) -> CharacterCard:
+        """Current card snapshot (new card versions roll out without restart)"""
+        return character_cards.get(self.card_path)
+    
+    def _card_version(self) -> Tuple:
+        """Identity of everything the static prefix depends on"""
+        c = self.character
+        return (c.card_path, c.version, self.jailbreak, self.authors_note)
+    
+    def _compile_prefix(self) -> CompiledPrefix:
+        """Build the static system message + example turns (no per-request data)"""
         system_prompt = f"""{self.character.description}
 
 {self.jailbreak}
 
 {self.authors_note}
 
-Current Mood: {mood.upper()}
-Time: {time_period.upper()}
-User Name: {user_name}
-
 Personality: {self.character.personality}
 Scenario: {self.character.scenario}"""
-
-        # Add memories if available
-        if memories and len(memories) > 0:
-            memory_text = "Active Memories: " + " | ".join(memories)
-            system_prompt += f"\n\n{memory_text}"
-
-        # Add world info if relevant
-        world_context = self.world_info.get_relevant_info(current_message)
-        if world_context:
-            system_prompt += f"\n\nContext: {world_context}"
-
-        messages = [{"role": "system", "content": system_prompt.strip()}]
-
-        # Add chat examples
+        
+        messages = [MappingProxyType({"role": "system", "content": system_prompt.strip()})]
+        
+        # Parse chat examples once
         example_dialogues = self.character.mes_example.split('<START>')
         for example in example_dialogues[-2:]:  # Last 2 examples only
-            if example.strip():
-                # Parse example format
-                lines = example.strip().split('\n')
-                for line in lines:
-                    if line.strip():
-                        if line.strip().startswith('{{user}}:'):
-                            messages.append({
-                                "role": "user", 
-                                "content": line.replace('{{user}}:', '').strip()
-                            })
-                        elif line.strip().startswith('{{char}}:'):
-                            messages.append({
-                                "role": "assistant", 
-                                "content": line.replace('{{char}}:', '').strip()
-                            })
-
-        # Add recent chat history (last 5 messages)
-        for msg in chat_history[-5:]:
-            if msg.get('content', '').strip():
-                messages.append({
+            for line in example.strip().split('\n'):
+                line = line.strip()
+                if line.startswith('{{user}}:'):
+                    messages.append(MappingProxyType({
+                        "role": "user",
+                        "content": line.replace('{{user}}:', '').strip()
+                    }))
+                elif line.startswith('{{char}}:'):
+                    messages.append(MappingProxyType({
+                        "role": "assistant",
+                        "content": line.replace('{{char}}:', '').strip()
+                    }))
+        
+        return CompiledPrefix(version=self._card_version(), messages=tuple(messages))
+    
+    def get_prefix(self) -> CompiledPrefix:
+        """Return compiled prefix, recompiling only if the card changed"""
+        if self._prefix is None or self._prefix.version != self._card_version():
+            self._prefix = self._compile_prefix()
+        return self._prefix
+    
+    def build_prompt(self, user_name: str, chat_history: List[Dict], current_message: str, 
+                     mood: str, time_period: str, memories: List[str] = None,
+                     world_context: Optional[str] = None,
+                     summary: Optional[str] = None) -> List[Dict]:
+        """Build the complete prompt SillyTavern-style
+        
+        Order is static prefix (system + examples) first, then the dynamic
+        context, so the provider can reuse a cached prefix across requests.
+        Parts are admitted by value until PROMPT_INPUT_TOKEN_BUDGET is used up.
+        """
+        estimate = TokenEstimator.estimate
+        overhead = TokenEstimator.MESSAGE_OVERHEAD
+        prefix = self.get_prefix()
+        system_msg, example_msgs = prefix.messages[0], prefix.messages[1:]
+        
+        header = [
+            f"Current Mood: {mood.upper()}",
+            f"Time: {time_period.upper()}",
+            f"User Name: {user_name}"
+        ]
+        
+        # Always sent: static system, dynamic header, current message (never clipped)
+        remaining = Config.PROMPT_INPUT_TOKEN_BUDGET - (
+            TokenEstimator.estimate_message(system_msg)
+            + estimate("\n".join(header)) + overhead
+            + estimate(current_message) + overhead
+        )
+        
+        history = []
+        for msg in chat_history[-Config.PROMPT_MAX_HISTORY:]:
+            content = msg.get('content', '')
+            if content.strip():
+                history.append({
                     "role": msg.get('role', 'user'),
-                    "content": msg.get('content', '')
+                    "content": TokenEstimator.truncate(content, Config.PROMPT_MAX_MESSAGE_TOKENS)
                 })
+        
+        def admit(cost: int) -> bool:
+            nonlocal remaining
+            if cost > remaining:
+                return False
+            remaining -= cost
+            return True
+        
+        # 1. Most recent turns
+        kept_history = set()
+        newest_first = list(range(len(history) - 1, -1, -1))
+        for idx in newest_first[:2]:
+            if not admit(TokenEstimator.estimate_message(history[idx])):
+                break
+            kept_history.add(idx)
+        
+        # 2. Rolling summary of older conversation
+        if summary:
+            summary = TokenEstimator.truncate(summary, Config.SUMMARY_MAX_TOKENS)
+            if not admit(estimate(summary) + 4):
+                summary = None
+        
+        # 3. Memories
+        kept_memories = [m for m in (memories or []) if admit(estimate(m) + 1)]
+        
+        # 4. World info
+        if world_context is None:
+            world_context = self.world_info.get_relevant_info(current_message)
+        if world_context and not admit(estimate(world_context) + 2):
+            world_context = None
+        
+        # 5. Example dialogues
+        examples_cost = sum(TokenEstimator.estimate_message(m) for m in example_msgs)
+        keep_examples = admit(examples_cost)
+        
+        # 6. Older history, newest first, until the budget runs out
+        for idx in newest_first[2:]:
+            if not admit(TokenEstimator.estimate_message(history[idx])):
+                break
+            kept_history.add(idx)
+        
+        messages = [dict(system_msg)]
+        if keep_examples:
+            messages.extend(dict(m) for m in example_msgs)
+        
+        # Dynamic suffix: mood, time, summary, memories, world context
+        dynamic = list(header)
+        if summary:
+            dynamic.append(f"Conversation so far: {summary}")
+        if kept_memories:
+            dynamic.append("Active Memories: " + " | ".join(kept_memories))
+        if world_context:
+            dynamic.append(f"Context: {world_context}")
+        messages.append({"role": "system", "content": "\n".join(dynamic)})
+
+        # Chat history (chronological order)
+        messages.extend(history[i] for i in sorted(kept_history))
 
         # Current user message
         messages.append({"role": "user", "content": current_message})
@@ -216,31 +587,11 @@ Scenario: {self.character.scenario}"""
         return messages
     
     def parse_response(self, raw_response: str, user_name: str) -> List[str]:
-        """Clean and parse LLM response"""
+        """Clean and parse LLM response (prefix strip, ||| split, placeholders, max 3)"""
         if not raw_response:
             return ["..."]
         
-        # Remove any "assistant:" or "{{char}}:" prefixes
-        response = re.sub(r'^(assistant|{{char}}):\s*', '', raw_response, flags=re.IGNORECASE)
-        
-        # Split by ||| for multiple messages
-        parts = response.split('|||')
-        
-        cleaned = []
-        for part in parts:
-            part = part.strip()
-            
-            # Replace {{user}} with actual user name
-            part = part.replace('{{user}}', user_name)
-            part = part.replace('{{char}}', 'Kavya')
-            
-            # Clean up any remaining brackets
-            part = re.sub(r'\{\{\w+\}\}', '', part)
-            
-            if part and len(part) > 2:
-                cleaned.append(part)
-        
-        return cleaned[:3]  # Max 3 messages
+        return response_pipeline.run(raw_response, 'reply', user_name, self.character.name)
 
 
 # ============================================================================
@@ -254,6 +605,11 @@ class Config:
     TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN', '')
     BOT_USERNAME = os.getenv('BOT_USERNAME', 'AskKavyaBot')
     
+    # Extra personas hosted in this process (JSON list, see load_personas)
+    PERSONAS_JSON = os.getenv('PERSONAS', '')
+    SISTER_BOT_NAMES = [n.strip() for n in os.getenv('SISTER_BOT_NAMES', 'Niyati').split(',') if n.strip()]
+    SHARED_GROUP_MEMORY_SIZE = int(os.getenv('SHARED_GROUP_MEMORY_SIZE', '10'))
+    
     # OpenAI (Multi-Key Support) - Groq
     GROQ_API_KEYS_STR = os.getenv('GROQ_API_KEYS', '')
     GROQ_API_KEYS_LIST = [k.strip() for k in GROQ_API_KEYS_STR.split(',') if k.strip()]
@@ -278,10 +634,18 @@ class Config:
     MAX_LOCAL_GROUPS_CACHE = int(os.getenv('MAX_LOCAL_GROUPS_CACHE', '1000'))
     CACHE_CLEANUP_INTERVAL = int(os.getenv('CACHE_CLEANUP_INTERVAL', '3600'))
     
+    # Character Card
+    CARD_RELOAD_CHECK_SECONDS = int(os.getenv('CARD_RELOAD_CHECK_SECONDS', '30'))
+    
     # Diary Settings
     DIARY_ACTIVE_HOURS = (20, 23)  # Send cards between 8 PM - 11 PM IST
     DIARY_MIN_ACTIVE_DAYS = 1      # Only users active in last 1 day
     
+    # Routine Check-ins (morning / night / random)
+    ROUTINE_ACTIVE_DAYS = int(os.getenv('ROUTINE_ACTIVE_DAYS', '2'))  # Only recently active users
+    ROUTINE_DND_HOURS = (23, 8)    # No check-ins 11 PM - 8 AM IST
+    ROUTINE_RANDOM_FRACTION = float(os.getenv('ROUTINE_RANDOM_FRACTION', '0.3'))
+    
     # Timezone
     DEFAULT_TIMEZONE = os.getenv('DEFAULT_TIMEZONE', 'Asia/Kolkata')
     
@@ -294,7 +658,11 @@ class Config:
     
     # Broadcast
     BROADCAST_RETRY_ATTEMPTS = int(os.getenv('BROADCAST_RETRY_ATTEMPTS', '3'))
-    BROADCAST_RATE_LIMIT = float(os.getenv('BROADCAST_RATE_LIMIT', '0.05'))
+    BROADCAST_GLOBAL_RATE = float(os.getenv('BROADCAST_GLOBAL_RATE', '25'))  # msgs/sec per bot (Telegram ~30)
+    BROADCAST_GROUP_RATE = float(os.getenv('BROADCAST_GROUP_RATE', '10'))  # msgs/sec to groups, per bot
+    BROADCAST_PER_CHAT_INTERVAL = float(os.getenv('BROADCAST_PER_CHAT_INTERVAL', '3'))  # Min gap per chat
+    BROADCAST_CONCURRENCY = int(os.getenv('BROADCAST_CONCURRENCY', '8'))
+    BROADCAST_PROGRESS_INTERVAL = int(os.getenv('BROADCAST_PROGRESS_INTERVAL', '10'))
     
     # Cooldown & Features
     USER_COOLDOWN_SECONDS = int(os.getenv('USER_COOLDOWN_SECONDS', '3'))
@@ -307,8 +675,70 @@ class Config:
     VOICE_ENABLED = os.getenv('VOICE_ENABLED', 'true').lower() == 'true'
     VOICE_REPLY_CHANCE = float(os.getenv('VOICE_REPLY_CHANCE', '0.15'))  # Lower chance for voice
     VOICE_MIN_TEXT_LENGTH = int(os.getenv('VOICE_MIN_TEXT_LENGTH', '15'))
-    VOICE_MAX_TEXT_LENGTH = int(os.getenv('VOICE_MAX_TEXT_LENGTH', '300'))
-    
+    VOICE_MAX_TEXT_LENGTH = int(os.getenv('VOICE_MAX_TEXT_LENGTH', '600'))
+    SAY_MAX_TEXT_LENGTH = int(os.getenv('SAY_MAX_TEXT_LENGTH', '1500'))
+    TTS_CHUNK_CHARS = int(os.getenv('TTS_CHUNK_CHARS', '200'))  # Long text is synthesized in parallel chunks
+    VOICE_CATALOGUE_FILE = os.getenv('VOICE_CATALOGUE_FILE', 'voice_catalogue.json')
+    VOICE_CATALOGUE_TTL = int(os.getenv('VOICE_CATALOGUE_TTL', str(7 * 24 * 3600)))
+    VOICE_CATALOGUE_FETCH_TIMEOUT = float(os.getenv('VOICE_CATALOGUE_FETCH_TIMEOUT', '10'))
+    VOICE_DEADLINE_SECONDS = float(os.getenv('VOICE_DEADLINE_SECONDS', '20'))  # Drop late voice notes
+    SAY_MAX_PER_MINUTE = int(os.getenv('SAY_MAX_PER_MINUTE', '3'))
+    # 'opus' or 'mp3'; opus needs the ffmpeg binary (with libopus), so default to mp3 without it
+    VOICE_OUTPUT_FORMAT = os.getenv('VOICE_OUTPUT_FORMAT', 'opus' if shutil.which('ffmpeg') else 'mp3').lower()
+    VOICE_FORMAT_OVERRIDES = dict(  # e.g. "en-IN-NeerjaNeural:mp3,hi-IN-MadhurNeural:opus"
+        item.strip().split(':', 1) for item in os.getenv('VOICE_FORMAT_OVERRIDES', '').split(',')
+        if ':' in item
+    )
+    VOICE_OPUS_BITRATE = os.getenv('VOICE_OPUS_BITRATE', '24k')
+
+    # TTS Executor (caps concurrent Edge-TTS websockets)
+    TTS_MAX_CONCURRENCY = int(os.getenv('TTS_MAX_CONCURRENCY', '3'))
+    TTS_MAX_QUEUE = int(os.getenv('TTS_MAX_QUEUE', '20'))
+    TTS_QUEUE_TIMEOUT = float(os.getenv('TTS_QUEUE_TIMEOUT', '15'))
+
+    # TTS Audio Cache (memory LRU + size-capped disk tier)
+    TTS_CACHE_DIR = os.getenv('TTS_CACHE_DIR', 'tts_cache')
+    TTS_MEMORY_CACHE_BYTES = int(os.getenv('TTS_MEMORY_CACHE_BYTES', str(8 * 1024 * 1024)))
+    TTS_DISK_CACHE_BYTES = int(os.getenv('TTS_DISK_CACHE_BYTES', str(200 * 1024 * 1024)))
+
+    # Telegram file_id reuse (uploaded media is re-sent by id)
+    TELEGRAM_FILE_ID_FILE = os.getenv('TELEGRAM_FILE_ID_FILE', 'telegram_file_ids.json')
+    TELEGRAM_FILE_ID_MAX = int(os.getenv('TELEGRAM_FILE_ID_MAX', '5000'))
+
+    # Prompt Token Budget
+    PROMPT_INPUT_TOKEN_BUDGET = int(os.getenv('PROMPT_INPUT_TOKEN_BUDGET', '1500'))
+    PROMPT_MAX_HISTORY = int(os.getenv('PROMPT_MAX_HISTORY', '10'))
+    PROMPT_MAX_MESSAGE_TOKENS = int(os.getenv('PROMPT_MAX_MESSAGE_TOKENS', '200'))  # Per history turn
+    RESPONSE_MAX_TOKENS = int(os.getenv('RESPONSE_MAX_TOKENS', '250'))
+    
+    # Rolling Conversation Summary
+    SUMMARY_ENABLED = os.getenv('SUMMARY_ENABLED', 'true').lower() == 'true'
+    SUMMARY_TRIGGER_MESSAGES = int(os.getenv('SUMMARY_TRIGGER_MESSAGES', '14'))
+    SUMMARY_KEEP_RECENT = int(os.getenv('SUMMARY_KEEP_RECENT', '6'))
+    SUMMARY_MAX_TOKENS = int(os.getenv('SUMMARY_MAX_TOKENS', '120'))
+    
+    # Memory Retrieval (BM25 over memories + diary)
+    MEMORY_TOP_K = int(os.getenv('MEMORY_TOP_K', '3'))
+    MEMORY_DIARY_LIMIT = int(os.getenv('MEMORY_DIARY_LIMIT', '50'))
+    MEMORY_INDEX_MAX_USERS = int(os.getenv('MEMORY_INDEX_MAX_USERS', '2000'))
+    
+    # World Info hot reload
+    WORLD_INFO_REFRESH_INTERVAL = int(os.getenv('WORLD_INFO_REFRESH_INTERVAL', '300'))
+
+    # Content Pool (pre-generated shayari / Geeta quotes)
+    CONTENT_POOL_SIZE = int(os.getenv('CONTENT_POOL_SIZE', '8'))
+    CONTENT_POOL_LOW_WATERMARK = int(os.getenv('CONTENT_POOL_LOW_WATERMARK', '3'))
+    CONTENT_POOL_RECENT_SIZE = int(os.getenv('CONTENT_POOL_RECENT_SIZE', '200'))
+    CONTENT_POOL_REFILL_INTERVAL = int(os.getenv('CONTENT_POOL_REFILL_INTERVAL', '600'))
+    CONTENT_POOL_REFILL_BATCH = int(os.getenv('CONTENT_POOL_REFILL_BATCH', '6'))
+    CONTENT_POOL_IDLE_SECONDS = int(os.getenv('CONTENT_POOL_IDLE_SECONDS', '60'))
+
+    # Canned replies for trivial messages ("hi", "good night"...)
+    CANNED_REPLY_ENABLED = os.getenv('CANNED_REPLY_ENABLED', 'true').lower() == 'true'
+    CANNED_REPLY_VARIANTS = int(os.getenv('CANNED_REPLY_VARIANTS', '4'))
+    CANNED_REPLY_TTL = int(os.getenv('CANNED_REPLY_TTL', '86400'))
+    CANNED_REPLY_REFRESH_CHANCE = float(os.getenv('CANNED_REPLY_REFRESH_CHANCE', '0.1'))
+
     @classmethod
     def validate(cls):
         """Validate configuration"""
@@ -345,6 +775,76 @@ logger = logging.getLogger(__name__)
 for lib in ['httpx', 'telegram', 'openai', 'httpcore']:
     logging.getLogger(lib).setLevel(logging.WARNING)
 
+# ============================================================================
+# PERSONAS (Multiple bots hosted in one process)
+# ============================================================================
+
+class Persona:
+    """One hosted bot identity: card, token, username and voice"""
+    
+    def __init__(self, name: str, token: str, username: str,
+                 card_path: str = "kavya_card.yaml", voice: Optional[str] = None):
+        self.name = name
+        self.token = token
+        self.username = username.lstrip('@')
+        self.card_path = card_path
+        self.voice = voice  # Edge-TTS ShortName, None = VoiceGenerator default
+        self.other_names: List[str] = []
+        self.primary = False
+    
+    @property
+    def scope(self) -> Optional[str]:
+        """Key for this persona's own chat state (None = primary, kept on the user row)"""
+        return None if self.primary else self.name.lower()
+    
+    def is_addressed_elsewhere(self, text: str) -> bool:
+        """True if the message calls another persona/sister bot but not this one"""
+        lower = text.lower()
+        if self.name.lower() in lower:
+            return False
+        return any(other.lower() in lower for other in self.other_names)
+
+
+def load_personas() -> List[Persona]:
+    """Primary persona from Config + extras from the PERSONAS env (JSON list)
+    
+    Example: [{"name": "Niyati", "token": "...", "username": "AskNiyatiBot",
+               "card": "niyati_card.yaml", "voice": "hi-IN-SwaraNeural"}]
+    """
+    personas = [Persona('Kavya', Config.TELEGRAM_BOT_TOKEN, Config.BOT_USERNAME)]
+    personas[0].primary = True
+    
+    if Config.PERSONAS_JSON:
+        try:
+            for item in json.loads(Config.PERSONAS_JSON):
+                if not item.get('token') or not item.get('name'):
+                    logger.warning(f"⚠️ Persona skipped (name/token missing): {item.get('name')}")
+                    continue
+                personas.append(Persona(
+                    name=item['name'],
+                    token=item['token'],
+                    username=item.get('username', ''),
+                    card_path=item.get('card', f"{item['name'].lower()}_card.yaml"),
+                    voice=item.get('voice')
+                ))
+        except Exception as e:
+            logger.error(f"❌ PERSONAS config error: {e}")
+    
+    names = [p.name for p in personas] + Config.SISTER_BOT_NAMES
+    for persona in personas:
+        persona.other_names = [n for n in dict.fromkeys(names) if n.lower() != persona.name.lower()]
+    
+    return personas
+
+
+PERSONAS = load_personas()
+
+
+def get_persona(context: ContextTypes.DEFAULT_TYPE) -> Persona:
+    """Persona of the bot that received this update"""
+    return context.bot_data.get('persona') or PERSONAS[0]
+
+
 # ============================================================================
 # HEALTH SERVER (Render.com)
 # ============================================================================
@@ -369,10 +869,16 @@ class HealthServer:
         return web.json_response({
             'status': 'running',
             'uptime_hours': round(uptime.total_seconds() / 3600, 2),
-            'stats': self.stats
+            'stats': self.stats,
+            'canned_replies': canned_replies.stats(),
+            'world_info': db.world_info_status(),
+            'postprocess': response_pipeline.stats(),
+            'tts_cache': voice_generator.stats()
         })
     
     async def start(self):
+        if self.runner:
+            return  # Already running (shared by all personas)
         self.runner = web.AppRunner(self.app)
         await self.runner.setup()
         site = web.TCPSite(self.runner, '0.0.0.0', Config.PORT)
@@ -461,9 +967,19 @@ class SupabaseClient:
                 logger.error(f"❌ Supabase connection error: {e}")
                 return False
     
+    async def has_column(self, table: str, column: str) -> bool:
+        """True if the column exists (PostgREST answers 400 for unknown columns)"""
+        try:
+            response = await self._get_client().get(f"{self.rest_url}/{table}?select={column}&limit=1")
+            return response.status_code == 200
+        except Exception as e:
+            logger.debug(f"Column check {table}.{column} error: {e}")
+            return False
+    
     async def select(self, table: str, columns: str = '*', 
-                     filters: Dict = None, limit: int = None) -> List[Dict]:
-        """SELECT from table"""
+                     filters: Dict = None, limit: int = None,
+                     order: str = None, conditions: Dict[str, str] = None) -> List[Dict]:
+        """SELECT from table (conditions = raw PostgREST ops, e.g. {'unreachable_at': 'is.null'})"""
         try:
             client = self._get_client()
             url = f"{self.rest_url}/{table}?select={columns}"
@@ -472,6 +988,13 @@ class SupabaseClient:
                 for key, value in filters.items():
                     url += f"&{key}=eq.{value}"
             
+            if conditions:
+                for key, value in conditions.items():
+                    url += f"&{key}={value}"
+            
+            if order:
+                url += f"&order={order}"
+            
             if limit:
                 url += f"&limit={limit}"
             
@@ -489,6 +1012,35 @@ class SupabaseClient:
             logger.error(f"Supabase SELECT exception: {e}")
             return []
     
+    async def select_all(self, table: str, order: str, columns: str = '*',
+                         conditions: Dict[str, str] = None,
+                         page_size: int = 1000) -> Optional[List[Dict]]:
+        """SELECT every matching row, one request per page (None if any page failed)
+        
+        order must be a unique column (e.g. 'user_id.asc') - PostgREST pages
+        are only stable under a total order while rows are being updated.
+        """
+        try:
+            client = self._get_client()
+            rows: List[Dict] = []
+            offset = 0
+            while True:
+                url = f"{self.rest_url}/{table}?select={columns}&order={order}&offset={offset}&limit={page_size}"
+                for key, value in (conditions or {}).items():
+                    url += f"&{key}={value}"
+                response = await client.get(url)
+                if response.status_code != 200:
+                    logger.error(f"Supabase SELECT error {response.status_code} at offset {offset}: {response.text}")
+                    return None
+                page = response.json()
+                rows.extend(page)
+                if len(page) < page_size:
+                    return rows
+                offset += page_size
+        except Exception as e:
+            logger.error(f"Supabase SELECT exception: {e}")
+            return None
+    
     async def insert(self, table: str, data: Dict) -> Optional[Dict]:
         """INSERT into table"""
         try:
@@ -510,16 +1062,20 @@ class SupabaseClient:
             logger.error(f"Supabase INSERT exception: {e}")
             return None
     
-    async def update(self, table: str, data: Dict, filters: Dict) -> Optional[Dict]:
-        """UPDATE table"""
+    async def update(self, table: str, data: Dict, filters: Dict,
+                     minimal: bool = False) -> Optional[Dict]:
+        """UPDATE table (minimal = don't echo the updated rows back)"""
         try:
             client = self._get_client()
             filter_parts = [f"{key}=eq.{value}" for key, value in filters.items()]
             url = f"{self.rest_url}/{table}?" + "&".join(filter_parts)
             
-            response = await client.patch(url, json=data)
+            headers = {**self.headers, 'Prefer': 'return=minimal'} if minimal else None
+            response = await client.patch(url, json=data, headers=headers)
             
-            if response.status_code == 200:
+            if response.status_code == 204:
+                return data
+            elif response.status_code == 200:
                 result = response.json()
                 return result[0] if isinstance(result, list) and result else data
             else:
@@ -566,6 +1122,139 @@ class SupabaseClient:
             logger.error(f"Supabase DELETE exception: {e}")
             return False
 
+# ============================================================================
+# LEXICAL MEMORY INDEX (BM25 over active memories + diary entries)
+# ============================================================================
+
+class UserMemoryIndex:
+    """Incremental BM25 index for one user's memories and diary entries"""
+    
+    K1 = 1.5
+    B = 0.75
+    
+    def __init__(self):
+        self.docs: Dict[str, Tuple[str, Dict[str, int], int]] = {}  # id -> (text, tf, length)
+        self.df: Dict[str, int] = defaultdict(int)
+        self.total_length = 0
+    
+    def add(self, doc_id: str, text: str):
+        if doc_id in self.docs:
+            return
+        tokens = MemoryIndex.tokenize(text)
+        tf: Dict[str, int] = defaultdict(int)
+        for tok in tokens:
+            tf[tok] += 1
+        for tok in tf:
+            self.df[tok] += 1
+        self.docs[doc_id] = (text, dict(tf), len(tokens))
+        self.total_length += len(tokens)
+    
+    def remove(self, doc_id: str):
+        doc = self.docs.pop(doc_id, None)
+        if not doc:
+            return
+        _, tf, length = doc
+        for tok in tf:
+            self.df[tok] -= 1
+            if self.df[tok] <= 0:
+                del self.df[tok]
+        self.total_length -= length
+    
+    def search(self, query: str, k: int) -> List[Tuple[float, str, str]]:
+        """Return up to k (score, doc_id, text) with score > 0, best first"""
+        n = len(self.docs)
+        if not n:
+            return []
+        avg_len = self.total_length / n or 1.0
+        terms = set(MemoryIndex.tokenize(query))
+        idf = {
+            t: math.log(1 + (n - self.df[t] + 0.5) / (self.df[t] + 0.5))
+            for t in terms if t in self.df
+        }
+        if not idf:
+            return []
+        
+        scored = []
+        for doc_id, (text, tf, length) in self.docs.items():
+            score = 0.0
+            for t, w in idf.items():
+                f = tf.get(t)
+                if f:
+                    score += w * f * (self.K1 + 1) / (f + self.K1 * (1 - self.B + self.B * length / avg_len))
+            if score > 0:
+                scored.append((score, doc_id, text))
+        
+        return heapq.nlargest(k, scored)
+
+
+class MemoryIndex:
+    """Per-user BM25 indexes, loaded lazily and updated incrementally"""
+    
+    _TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+    STOPWORDS = frozenset({
+        'the', 'is', 'am', 'are', 'to', 'and', 'of', 'in', 'on', 'it', 'my', 'me', 'you',
+        'hai', 'hain', 'ho', 'ka', 'ki', 'ke', 'ko', 'se', 'mein', 'main', 'hoon',
+        'tha', 'thi', 'kya', 'aur', 'bhi', 'ye', 'yeh', 'wo', 'woh', 'na', 'nahi'
+    })
+    
+    def __init__(self):
+        self.users: "OrderedDict[Any, UserMemoryIndex]" = OrderedDict()  # user_id or (user_id, persona)
+    
+    @classmethod
+    def tokenize(cls, text: str) -> List[str]:
+        return [t for t in cls._TOKEN_RE.findall(text.lower())
+                if len(t) > 1 and t not in cls.STOPWORDS]
+    
+    @staticmethod
+    def active_notes(prefs: Dict) -> List[str]:
+        """Extract active memory notes from preferences"""
+        notes = []
+        for m in prefs.get('active_memories', []) or []:
+            if isinstance(m, dict):
+                if m.get('status') == 'active' and m.get('note'):
+                    notes.append(m['note'])
+            elif isinstance(m, str):
+                notes.append(m)
+        return notes
+    
+    def get(self, user_id: int) -> Optional[UserMemoryIndex]:
+        index = self.users.get(user_id)
+        if index is not None:
+            self.users.move_to_end(user_id)
+        return index
+    
+    def build(self, user_id: int, notes: List[str], diary_entries: List[Dict]) -> UserMemoryIndex:
+        index = UserMemoryIndex()
+        for note in notes:
+            index.add(f"memory:{note}", note)
+        for entry in diary_entries:
+            if entry.get('content'):
+                index.add(f"diary:{entry.get('timestamp') or entry['content']}", entry['content'])
+        self.users[user_id] = index
+        while len(self.users) > Config.MEMORY_INDEX_MAX_USERS:
+            self.users.popitem(last=False)
+        return index
+    
+    def sync_memories(self, user_id: int, notes: List[str]):
+        """Make memory docs match the current active notes (only if loaded)"""
+        index = self.users.get(user_id)
+        if index is None:
+            return
+        wanted = {f"memory:{n}": n for n in notes}
+        for doc_id in [d for d in index.docs if d.startswith('memory:') and d not in wanted]:
+            index.remove(doc_id)
+        for doc_id, note in wanted.items():
+            index.add(doc_id, note)
+    
+    def add_diary(self, user_id: int, entry: Dict):
+        index = self.users.get(user_id)
+        if index is not None and entry.get('content'):
+            index.add(f"diary:{entry.get('timestamp') or entry['content']}", entry['content'])
+    
+    def drop(self, user_id: int):
+        self.users.pop(user_id, None)
+
+
 # ============================================================================
 # DATABASE CLASS (Identical to Niyati, using same table names)
 # ============================================================================
@@ -587,6 +1276,18 @@ class Database:
         self.local_diary_entries: Dict[int, List[Dict]] = defaultdict(list)
         self.local_group_responses: Dict[int, Dict] = defaultdict(lambda: {'last_response': '', 'timestamp': datetime.min})
         self.local_world_info: List[Dict] = []
+        self.world_info = WorldInfo()  # Compiled lorebook (default until DB loads)
+        self.world_info_version: Optional[str] = None  # Max updated_at seen
+        self.world_info_revision = 0                   # Bumped on every swap
+        self._world_rows: Dict[Any, Dict] = {}
+        self._world_lock = asyncio.Lock()
+        self.memory_index = MemoryIndex()
+        self.local_broadcast_jobs: Dict[str, Dict] = {}
+        self.local_content_pool: Dict[str, List[str]] = {}
+        self.local_persona_chats: Dict[Tuple[int, str], Dict] = {}
+        self.unreachable_chats: set = set()  # Blocked / kicked the primary bot (this process)
+        self.persona_unreachable: Dict[str, set] = defaultdict(set)  # Secondary bots, by Persona.scope
+        self.unreachable_column = False  # users/groups.unreachable_at exists (probed at initialize)
         
         # Cache access tracking
         self._user_access_times: Dict[int, datetime] = {}
@@ -610,6 +1311,14 @@ class Database:
                     self.connected = await self.client.verify_connection()
                     
                     if self.connected:
+                        self.unreachable_column = (
+                            await self.client.has_column('users', 'unreachable_at')
+                            and await self.client.has_column('groups', 'unreachable_at')
+                        )
+                        if not self.unreachable_column:
+                            logger.warning("⚠️ unreachable_at column missing (see supabase_schema.sql) - "
+                                           "tracking blocked chats in memory only")
+                        
                         # Load world info from DB if available
                         await self._load_world_info_from_db()
                         logger.info("✅ Supabase connected and verified")
@@ -628,12 +1337,97 @@ class Database:
     async def _load_world_info_from_db(self):
         """Load world info entries from database"""
         try:
-            self.local_world_info = await self.client.select('world_info', '*')
+            rows = await self.client.select('world_info', '*')
+            async with self._world_lock:
+                self._world_rows = self._key_world_rows(rows)
+                self._swap_world_info()
             if self.local_world_info:
                 logger.info(f"✅ Loaded {len(self.local_world_info)} world info entries")
         except:
             self.local_world_info = []
     
+    @staticmethod
+    def _key_world_rows(rows: List[Dict]) -> Dict[Any, Dict]:
+        """Rows by id; rows without one can't be tracked across refreshes, so skip them"""
+        keyed = {row['id']: row for row in rows if row.get('id') is not None}
+        if len(keyed) < len(rows):
+            logger.warning(f"⚠️ Skipped {len(rows) - len(keyed)} world info rows without an id")
+        return keyed
+    
+    def _swap_world_info(self):
+        """Compile current rows and atomically replace the live matcher"""
+        rows = [r for r in self._world_rows.values() if r.get('enabled', True) is not False]
+        compiled = WorldInfo(rows) if rows else WorldInfo()
+        stamps = [r['updated_at'] for r in self._world_rows.values() if r.get('updated_at')]
+        
+        # Compile first, then swap references - readers never see a half-built matcher
+        self.local_world_info = rows
+        self.world_info = compiled
+        self.world_info_version = max(stamps) if stamps else self.world_info_version
+        self.world_info_revision += 1
+    
+    async def refresh_world_info(self) -> bool:
+        """Fetch only world_info rows changed since the last version; True if swapped
+        
+        Hard deletes are caught by a one-row count query: a full resync only
+        happens when the table's row count stops matching ours.
+        """
+        if not (self.connected and self.client):
+            return False
+        
+        async with self._world_lock:
+            client = self.client._get_client()
+            url = f"{self.client.rest_url}/world_info"
+            changed = False
+            
+            try:
+                params = {'select': '*', 'order': 'updated_at.asc'}
+                if self.world_info_version:
+                    params['updated_at'] = f"gt.{self.world_info_version}"
+                
+                response = await client.get(url, params=params)
+                if response.status_code != 200:
+                    logger.debug(f"World info refresh error {response.status_code}: {response.text}")
+                    return False
+                
+                for key, row in self._key_world_rows(response.json()).items():
+                    if self._world_rows.get(key) != row:
+                        self._world_rows[key] = row
+                        changed = True
+                
+                count_resp = await client.get(
+                    url, params={'select': 'id', 'id': 'not.is.null', 'limit': '1'},
+                    headers={'Prefer': 'count=exact'}
+                )
+                total = count_resp.headers.get('content-range', '').rpartition('/')[2]
+                if count_resp.status_code in (200, 206) and total.isdigit() \
+                        and int(total) != len(self._world_rows):
+                    full = await client.get(url, params={'select': '*'})
+                    if full.status_code == 200:
+                        rows = self._key_world_rows(full.json())
+                        if rows != self._world_rows:
+                            self._world_rows = rows
+                            changed = True
+            except Exception as e:
+                logger.debug(f"World info refresh exception: {e}")  # Swap whatever was merged
+            
+            if changed:
+                self._swap_world_info()
+                logger.info(
+                    f"🌍 World info reloaded: {len(self.local_world_info)} entries "
+                    f"(rev {self.world_info_revision}, version {self.world_info_version})"
+                )
+            return changed
+    
+    def world_info_status(self) -> Dict:
+        """Version info for /status"""
+        return {
+            'version': self.world_info_version,
+            'revision': self.world_info_revision,
+            'entries': len(self.world_info.entries),
+            'source': 'db' if self.local_world_info else 'default'
+        }
+    
     async def cleanup_local_cache(self):
         """Cleanup old entries from local cache"""
         now = datetime.now(timezone.utc)
@@ -646,6 +1440,7 @@ class Database:
                 self.local_users.pop(uid, None)
                 self._user_access_times.pop(uid, None)
                 self.local_diary_entries.pop(uid, None)
+                self.memory_index.drop(uid)
             if to_remove:
                 logger.info(f"🧹 Cleaned {len(to_remove)} users from cache")
         
@@ -731,29 +1526,41 @@ class Database:
 
         return self.local_users[user_id]
     
-    async def update_user_activity(self, user_id: int):
-        """Update user's last activity timestamp"""
+    async def update_user_activity(self, user_id: int, private: bool = False, persona: str = None):
+        """Update user's last activity timestamp
+        
+        Only a DM proves the user can be reached by that bot again - talking
+        in a group says nothing about a block in private.
+        """
         self._user_access_times[user_id] = datetime.now(timezone.utc)
+        reactivate = private and not persona  # DB flag belongs to the primary bot
+        if private and persona:
+            self.persona_unreachable[persona].discard(user_id)
         
         if self.connected and self.client:
+            fields = {'last_activity': datetime.now(timezone.utc).isoformat()}
+            if reactivate and self.unreachable_column:
+                fields['unreachable_at'] = None  # Messaging us again = reachable again
             try:
-                await self.client.update('users', {
-                    'last_activity': datetime.now(timezone.utc).isoformat()
-                }, {'user_id': user_id})
+                await self.client.update('users', fields, {'user_id': user_id})
             except Exception as e:
                 logger.debug(f"Update activity error: {e}")
         
+        if reactivate:
+            self.unreachable_chats.discard(user_id)
         if user_id in self.local_users:
             self.local_users[user_id]['last_activity'] = datetime.now(timezone.utc).isoformat()
+            if reactivate:
+                self.local_users[user_id].pop('unreachable_at', None)
     
     async def get_active_users(self, days: int = 1) -> List[Dict]:
         """Get users active in last N days"""
         if self.connected and self.client:
             try:
                 cutoff = datetime.now(timezone.utc) - timedelta(days=days)
-                users = await self.client.select('users', '*')
+                users = await self.client.select('users', '*', conditions=self._reachable_filter())
                 active_users = []
-                for u in users:
+                for u in self._reachable(users, 'user_id'):
                     last_act = u.get('last_activity')
                     if last_act:
                         try:
@@ -769,7 +1576,7 @@ class Database:
         
         # Local fallback
         cutoff = datetime.now(timezone.utc) - timedelta(days=days)
-        return [u for u in self.local_users.values() 
+        return [u for u in self._reachable(self.local_users.values(), 'user_id')
                 if datetime.fromisoformat(u.get('last_activity', '2000-01-01').replace('Z', '+00:00')) >= cutoff]
     
     async def add_user_memory(self, user_id: int, note: str):
@@ -790,6 +1597,7 @@ class Database:
         memories = memories[-5:]
         
         prefs['active_memories'] = memories
+        self.memory_index.sync_memories(user_id, MemoryIndex.active_notes(prefs))
         
         if self.connected and self.client:
             await self.client.update('users', {
@@ -816,6 +1624,7 @@ class Database:
             if m['note'] == note and m['status'] == 'active':
                 m['status'] = 'asked'
                 break
+        self.memory_index.sync_memories(user_id, MemoryIndex.active_notes(prefs))
         
         if self.connected and self.client:
             await self.client.update('users', {
@@ -843,6 +1652,7 @@ class Database:
                 logger.debug(f"Diary insert error: {e}")
         
         self.local_diary_entries[user_id].append(entry)
+        self.memory_index.add_diary(user_id, entry)
         logger.info(f"📖 Diary entry added for user {user_id}")
     
     async def get_todays_diary(self, user_id: int) -> List[Dict]:
@@ -860,26 +1670,83 @@ class Database:
         
         return [e for e in self.local_diary_entries[user_id] if e['date'] == today]
     
-    # ========== WORLD INFO OPERATIONS ==========
+    async def get_todays_diary_counts(self, user_ids: List[int], batch_size: int = 200) -> Dict[int, int]:
+        """Today's diary entry count per user, one `in` query per batch of users
+        
+        Users from a failed batch are left out - their count is unknown, not 0.
+        """
+        today = datetime.now(timezone.utc).isoformat()[:10]
+        
+        if self.connected and self.client:
+            counts: Dict[int, int] = {}
+            for i in range(0, len(user_ids), batch_size):
+                batch_ids = user_ids[i:i + batch_size]
+                batch = ','.join(str(uid) for uid in batch_ids)
+                rows = await self.client.select_all('diary_entries', 'id.asc', 'user_id', {
+                    'date': f"eq.{today}",
+                    'user_id': f"in.({batch})"
+                })
+                if rows is None:
+                    logger.warning(f"⚠️ Diary counts unavailable for {len(batch_ids)} users")
+                    continue
+                counts.update(dict.fromkeys(batch_ids, 0))
+                for row in rows:
+                    counts[row['user_id']] += 1
+            return counts
+        
+        return {
+            uid: sum(1 for e in self.local_diary_entries.get(uid, ()) if e['date'] == today)
+            for uid in user_ids
+        }
     
-    def get_world_info_context(self, message: str) -> str:
-        """Get world info context for a message"""
-        if not self.local_world_info:
-            # Fallback to default world info
-            wi = WorldInfo()
-            return wi.get_relevant_info(message)
+    async def get_recent_diary(self, user_id: int, limit: int = 50) -> List[Dict]:
+        """Get user's most recent diary entries (any day)"""
+        if self.connected and self.client:
+            try:
+                return await self.client.select('diary_entries', 'content,timestamp', {
+                    'user_id': user_id
+                }, limit=limit, order='timestamp.desc')
+            except Exception as e:
+                logger.debug(f"Get recent diary error: {e}")
         
-        message_lower = message.lower()
-        relevant = []
+        return self.local_diary_entries[user_id][-limit:]
+    
+    async def get_relevant_memories(self, user_id: int, query: str, k: int = 3,
+                                    prefs: Dict = None, persona: str = None,
+                                    state: Dict = None) -> List[str]:
+        """Top-k memories/diary entries lexically relevant to the query"""
+        index_key = (user_id, persona) if persona else user_id
+        index = self.memory_index.get(index_key)
+        if index is None and persona:
+            if state is None:
+                state = await self.get_persona_chat(user_id, persona)
+            index = self.memory_index.build(index_key, [], state['memories'])
+        elif index is None:
+            if prefs is None:
+                prefs = await self.get_user_preferences(user_id)
+            diary = await self.get_recent_diary(user_id, Config.MEMORY_DIARY_LIMIT)
+            index = self.memory_index.build(user_id, MemoryIndex.active_notes(prefs), diary)
         
-        for entry in self.local_world_info:
-            if any(key.lower() in message_lower for key in entry.get('keys', [])):
-                relevant.append(entry.get('content', ''))
+        results = [text for _, _, text in index.search(query, k)]
+        if results:
+            return results
         
-        return " ".join(relevant[:2])
+        # Nothing matched - still surface the newest pending memory to ask about
+        pending = [doc_id for doc_id in index.docs if doc_id.startswith('memory:')]
+        return [index.docs[pending[-1]][0]] if pending else []
+    
+    # ========== WORLD INFO OPERATIONS ==========
     
-    async def get_user_context(self, user_id: int) -> List[Dict]:
-        """Get user conversation context"""
+    def get_world_info_context(self, message: str) -> str:
+        """Get world info context for a message (DB lore, or default entries)"""
+        return self.world_info.get_relevant_info(message)
+    
+    async def get_user_context(self, user_id: int, persona: str = None) -> List[Dict]:
+        """Get user conversation context (with one persona when scoped)"""
+        if persona:
+            state = await self.get_persona_chat(user_id, persona)
+            return state['messages'][-Config.MAX_PRIVATE_MESSAGES:]
+        
         if self.connected and self.client:
             try:
                 users_list = await self.client.select('users', 'messages', {'user_id': user_id})
@@ -901,14 +1768,20 @@ class Database:
         
         return []
     
-    async def save_message(self, user_id: int, role: str, content: str):
-        """Save message to user history"""
+    async def save_message(self, user_id: int, role: str, content: str, persona: str = None):
+        """Save message to user history (with one persona when scoped)"""
         new_msg = {
             'role': role,
             'content': content,
             'timestamp': datetime.now(timezone.utc).isoformat()
         }
         
+        if persona:
+            state = await self.get_persona_chat(user_id, persona)
+            state['messages'] = (state['messages'] + [new_msg])[-Config.MAX_PRIVATE_MESSAGES:]
+            await self.save_persona_chat(user_id, persona, state)
+            return
+        
         if self.connected and self.client:
             try:
                 users_list = await self.client.select('users', 'messages,total_messages', {'user_id': user_id})
@@ -946,12 +1819,22 @@ class Database:
             self.local_users[user_id]['total_messages'] = \
                 self.local_users[user_id].get('total_messages', 0) + 1
     
-    async def clear_user_memory(self, user_id: int):
-        """Clear user conversation memory"""
+    async def clear_user_memory(self, user_id: int, persona: str = None):
+        """Clear user conversation memory (raw turns + rolling summary)"""
+        if persona:
+            state = await self.get_persona_chat(user_id, persona)
+            state.update(messages=[], summary='')
+            await self.save_persona_chat(user_id, persona, state)
+            return
+        
+        prefs = await self.get_user_preferences(user_id)
+        prefs.pop('conversation_summary', None)
+        
         if self.connected and self.client:
             try:
                 await self.client.update('users', {
                     'messages': json.dumps([]),
+                    'preferences': json.dumps(prefs),
                     'updated_at': datetime.now(timezone.utc).isoformat()
                 }, {'user_id': user_id})
                 logger.info(f"Memory cleared for user: {user_id}")
@@ -961,13 +1844,74 @@ class Database:
         
         if user_id in self.local_users:
             self.local_users[user_id]['messages'] = []
+            self.local_users[user_id]['preferences'] = prefs
     
-    async def update_preference(self, user_id: int, key: str, value: bool):
-        """Update user preference"""
-        pref_key = f"{key}_enabled"
+    async def get_conversation_summary(self, user_id: int, persona: str = None) -> str:
+        """Get user's rolling conversation summary"""
+        if persona:
+            return (await self.get_persona_chat(user_id, persona))['summary']
+        prefs = await self.get_user_preferences(user_id)
+        return prefs.get('conversation_summary', '')
+    
+    async def apply_conversation_summary(self, user_id: int, summary: str,
+                                         covered: List[Dict], persona: str = None):
+        """Store rolling summary and drop the raw turns it now covers"""
+        covered_stamps = {m.get('timestamp') for m in covered if m.get('timestamp')}
         
-        if self.connected and self.client:
-            try:
+        def remaining(messages: List[Dict]) -> List[Dict]:
+            if covered_stamps:
+                return [m for m in messages if m.get('timestamp') not in covered_stamps]
+            return messages[len(covered):]
+        
+        if persona:
+            state = await self.get_persona_chat(user_id, persona)
+            state.update(messages=remaining(state['messages']), summary=summary)
+            await self.save_persona_chat(user_id, persona, state)
+            return
+        
+        if self.connected and self.client:
+            try:
+                users_list = await self.client.select('users', 'messages,preferences', {'user_id': user_id})
+                
+                if users_list and len(users_list) > 0:
+                    messages = users_list[0].get('messages', '[]')
+                    if isinstance(messages, str):
+                        try:
+                            messages = json.loads(messages)
+                        except:
+                            messages = []
+                    if not isinstance(messages, list):
+                        messages = []
+                    
+                    prefs = users_list[0].get('preferences', '{}')
+                    if isinstance(prefs, str):
+                        try:
+                            prefs = json.loads(prefs)
+                        except:
+                            prefs = {}
+                    
+                    prefs['conversation_summary'] = summary
+                    
+                    await self.client.update('users', {
+                        'messages': json.dumps(remaining(messages)),
+                        'preferences': json.dumps(prefs),
+                        'updated_at': datetime.now(timezone.utc).isoformat()
+                    }, {'user_id': user_id})
+                return
+            except Exception as e:
+                logger.debug(f"Apply summary error: {e}")
+        
+        if user_id in self.local_users:
+            local = self.local_users[user_id]
+            local['messages'] = remaining(local.get('messages', []))
+            local.setdefault('preferences', {})['conversation_summary'] = summary
+    
+    async def update_preference(self, user_id: int, key: str, value: bool):
+        """Update user preference"""
+        pref_key = f"{key}_enabled"
+        
+        if self.connected and self.client:
+            try:
                 users_list = await self.client.select('users', 'preferences', {'user_id': user_id})
                 
                 if users_list and len(users_list) > 0:
@@ -1015,33 +1959,54 @@ class Database:
         
         return {'meme_enabled': True, 'shayari_enabled': True, 'geeta_enabled': True, 'voice_enabled': False, 'diary_enabled': True, 'active_memories': []}
     
-    async def get_all_users(self) -> List[Dict]:
-        """Get ALL users with Pagination"""
-        if self.connected and self.client:
+    @staticmethod
+    def _parse_prefs(prefs) -> Dict:
+        if isinstance(prefs, str):
             try:
-                all_data = []
-                offset = 0
-                limit = 1000
-                
-                while True:
-                    url = f"{self.client.rest_url}/users?select=user_id,first_name,username&offset={offset}&limit={limit}"
-                    client = self.client._get_client()
-                    response = await client.get(url)
-                    
-                    data = response.json()
-                    if not data:
-                        break
-                        
-                    all_data.extend(data)
-                    if len(data) < limit:
-                        break
-                    
-                    offset += limit
-                
-                return all_data
-            except Exception as e:
-                logger.error(f"Get all users error: {e}")
+                return json.loads(prefs)
+            except ValueError:
+                return {}
+        return prefs or {}
+    
+    async def get_checkin_candidates(self, active_days: int, pref_key: str = None,
+                                     require_messages: bool = False) -> List[Dict]:
+        """Reachable users active in the last N days (filtered by the DB), minus opt-outs"""
+        cutoff = datetime.now(timezone.utc) - timedelta(days=active_days)
+        if self.connected and self.client:
+            conditions = {
+                'last_activity': f"gte.{cutoff.strftime('%Y-%m-%dT%H:%M:%SZ')}",
+                **self._reachable_filter()
+            }
+            if require_messages:
+                conditions['total_messages'] = 'gt.0'
+            rows = await self.client.select_all('users', 'user_id.asc', 'user_id,first_name,preferences', conditions)
+            if rows is None:
+                logger.error("❌ Check-in candidates incomplete - skipping this run")
+                return []
+        else:
+            rows = [u for u in self.local_users.values()
+                    if datetime.fromisoformat(u.get('last_activity', '2000-01-01').replace('Z', '+00:00')) >= cutoff
+                    and (u.get('messages') or not require_messages)]
+        
+        candidates = []
+        for row in self._reachable(rows, 'user_id'):
+            row['preferences'] = self._parse_prefs(row.get('preferences'))
+            if pref_key and not row['preferences'].get(pref_key, True):
+                continue  # Opted out
+            candidates.append(row)
+        return candidates
+    
+    async def get_all_users(self, reachable_only: bool = True, persona: str = None) -> List[Dict]:
+        """Get ALL users with Pagination (skips users who blocked this persona's bot unless reachable_only=False)"""
+        if self.connected and self.client:
+            conditions = self._reachable_filter() if reachable_only and not persona else None
+            all_data = await self.client.select_all('users', 'user_id.asc', 'user_id,first_name,username', conditions)
+            if all_data is None:
+                logger.error("❌ Get all users failed - user list incomplete")
                 return []
+            return self._reachable(all_data, 'user_id', persona) if reachable_only else all_data
+        if reachable_only:
+            return self._reachable(self.local_users.values(), 'user_id', persona)
         return list(self.local_users.values())
     
     async def get_user_count(self) -> int:
@@ -1054,10 +2019,67 @@ class Database:
                 logger.debug(f"User count error: {e}")
         return len(self.local_users)
     
+    # ========== PER-PERSONA CHAT STATE (secondary personas) ==========
+    
+    @staticmethod
+    def _parse_list(value) -> List:
+        if isinstance(value, str):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                return []
+        return value if isinstance(value, list) else []
+    
+    async def get_persona_chat(self, user_id: int, persona: str) -> Dict:
+        """History, rolling summary and memories one secondary persona keeps for a user"""
+        if self.connected and self.client:
+            try:
+                rows = await self.client.select('persona_chats', 'messages,summary,memories', {
+                    'user_id': user_id,
+                    'persona': persona
+                })
+                row = rows[0] if rows else {}
+                return {
+                    'messages': self._parse_list(row.get('messages')),
+                    'summary': row.get('summary') or '',
+                    'memories': self._parse_list(row.get('memories'))
+                }
+            except Exception as e:
+                logger.debug(f"Get persona chat error: {e}")
+        
+        local = self.local_persona_chats.get((user_id, persona), {})
+        return {
+            'messages': list(local.get('messages', [])),
+            'summary': local.get('summary', ''),
+            'memories': list(local.get('memories', []))
+        }
+    
+    async def save_persona_chat(self, user_id: int, persona: str, state: Dict):
+        """Upsert a persona's chat state (keyed by user_id + persona)"""
+        if self.connected and self.client:
+            if await self.client.upsert('persona_chats', {
+                'user_id': user_id,
+                'persona': persona,
+                'messages': json.dumps(state['messages']),
+                'summary': state['summary'],
+                'memories': json.dumps(state['memories']),
+                'updated_at': datetime.now(timezone.utc).isoformat()
+            }):
+                return
+        self.local_persona_chats[(user_id, persona)] = state
+    
+    async def add_persona_memory(self, user_id: int, persona: str, content: str):
+        """Remember a life event the user told a secondary persona (not the shared diary)"""
+        entry = {'content': content, 'timestamp': datetime.now(timezone.utc).isoformat()}
+        state = await self.get_persona_chat(user_id, persona)
+        state['memories'] = (state['memories'] + [entry])[-Config.MEMORY_DIARY_LIMIT:]
+        await self.save_persona_chat(user_id, persona, state)
+        self.memory_index.add_diary((user_id, persona), entry)
+    
     # ========== GROUP OPERATIONS (Identical) ==========
     
-    async def get_or_create_group(self, chat_id: int, title: str = None) -> Dict:
-        """Get or create group"""
+    async def get_or_create_group(self, chat_id: int, title: str = None, persona: str = None) -> Dict:
+        """Get or create group (a message from it means this persona's bot is a member again)"""
         self._group_access_times[chat_id] = datetime.now(timezone.utc)
         
         if self.connected and self.client:
@@ -1066,6 +2088,8 @@ class Database:
                 
                 if groups_list and len(groups_list) > 0:
                     group = groups_list[0]
+                    if self.is_unreachable(chat_id, persona, row=group):
+                        await self.mark_chat_reachable(chat_id, persona)  # Bot was added back
                     if title and group.get('title') != title:
                         await self.client.update('groups', {
                             'title': title,
@@ -1099,6 +2123,8 @@ class Database:
                 'created_at': datetime.now(timezone.utc).isoformat()
             }
             logger.info(f"✅ New group (local): {chat_id} ({title})")
+        elif self.is_unreachable(chat_id, persona, row=self.local_groups[chat_id]):
+            await self.mark_chat_reachable(chat_id, persona)
         
         return self.local_groups[chat_id]
     
@@ -1168,15 +2194,83 @@ class Database:
                 return []
         return []
     
-    async def get_all_groups(self) -> List[Dict]:
-        """Get all groups"""
+    async def get_all_groups(self, reachable_only: bool = True, persona: str = None) -> List[Dict]:
+        """Get all groups (skips groups this persona's bot was kicked from unless reachable_only=False)"""
         if self.connected and self.client:
             try:
-                return await self.client.select('groups', '*')
+                if not reachable_only or persona:
+                    groups = await self.client.select('groups', '*')
+                    return self._reachable(groups, 'chat_id', persona) if reachable_only else groups
+                groups = await self.client.select('groups', '*', conditions=self._reachable_filter())
+                return self._reachable(groups, 'chat_id')
             except Exception as e:
                 logger.debug(f"Get all groups error: {e}")
+        if reachable_only:
+            return self._reachable(self.local_groups.values(), 'chat_id', persona)
         return list(self.local_groups.values())
     
+    # ========== UNREACHABLE CHATS (blocked / kicked) ==========
+    # Reachability is per bot. The unreachable_at flag belongs to the primary
+    # persona, whose scheduled jobs read it; secondary personas (by scope)
+    # only broadcast, and remember their blocks for this process. Without the
+    # column (schema not applied) the primary falls back to the same in-process set.
+    
+    def _reachable_filter(self) -> Dict[str, str]:
+        """Server-side filter on unreachable_at - only if the column exists"""
+        return {'unreachable_at': 'is.null'} if self.unreachable_column else {}
+    
+    def is_unreachable(self, chat_id: int, persona: str = None, row: Dict = None) -> bool:
+        if persona:
+            return chat_id in self.persona_unreachable[persona]
+        return chat_id in self.unreachable_chats or bool(row and row.get('unreachable_at'))
+    
+    def _reachable(self, rows, key: str, persona: str = None) -> List[Dict]:
+        """Drop rows marked unreachable for this persona (DB flag or seen in this process)"""
+        return [r for r in rows if not self.is_unreachable(r.get(key), persona, row=r)]
+    
+    async def mark_chat_unreachable(self, chat_id: int, persona: str = None):
+        """First Forbidden for a chat: stop this persona's jobs from targeting it"""
+        if persona:
+            if chat_id not in self.persona_unreachable[persona]:
+                self.persona_unreachable[persona].add(chat_id)
+                logger.info(f"🚫 Chat {chat_id} marked unreachable for {persona}")
+            return
+        if chat_id in self.unreachable_chats:
+            return
+        self.unreachable_chats.add(chat_id)
+        now = datetime.now(timezone.utc).isoformat()
+        table, key, local = ('users', 'user_id', self.local_users) if chat_id > 0 \
+            else ('groups', 'chat_id', self.local_groups)
+        
+        if self.connected and self.client and self.unreachable_column:
+            try:
+                await self.client.update(table, {'unreachable_at': now}, {key: chat_id})
+            except Exception as e:
+                logger.debug(f"Mark unreachable error: {e}")
+        
+        if chat_id in local:
+            local[chat_id]['unreachable_at'] = now
+        logger.info(f"🚫 Chat {chat_id} marked unreachable")
+    
+    async def mark_chat_reachable(self, chat_id: int, persona: str = None):
+        """Chat talked to us again - include it in jobs again"""
+        if persona:
+            self.persona_unreachable[persona].discard(chat_id)
+            return
+        self.unreachable_chats.discard(chat_id)
+        table, key, local = ('users', 'user_id', self.local_users) if chat_id > 0 \
+            else ('groups', 'chat_id', self.local_groups)
+        
+        if self.connected and self.client and self.unreachable_column:
+            try:
+                await self.client.update(table, {'unreachable_at': None}, {key: chat_id})
+            except Exception as e:
+                logger.debug(f"Mark reachable error: {e}")
+        
+        if chat_id in local:
+            local[chat_id].pop('unreachable_at', None)
+        logger.info(f"✅ Chat {chat_id} reachable again")
+    
     async def get_group_count(self) -> int:
         """Get total group count"""
         if self.connected and self.client:
@@ -1220,6 +2314,70 @@ class Database:
             'timestamp': datetime.now(timezone.utc)
         }
     
+    # ========== BROADCAST JOBS ==========
+    
+    async def save_broadcast_job(self, row: Dict):
+        """Upsert a full broadcast job row (keyed by job_id) - once per job"""
+        if self.connected and self.client:
+            if await self.client.upsert('broadcast_jobs', row):
+                return
+        self.local_broadcast_jobs[row['job_id']] = row
+    
+    async def update_broadcast_job(self, job_id: str, fields: Dict):
+        """Patch a saved job's progress columns without echoing the row back"""
+        if job_id in self.local_broadcast_jobs:
+            self.local_broadcast_jobs[job_id].update(fields)
+            return
+        if self.connected and self.client:
+            await self.client.update('broadcast_jobs', fields, {'job_id': job_id}, minimal=True)
+    
+    async def get_broadcast_jobs(self, limit: int = 20) -> List[Dict]:
+        """Most recent broadcast jobs, newest first"""
+        if self.connected and self.client:
+            try:
+                rows = await self.client.select(
+                    'broadcast_jobs', '*', limit=limit, order='created_at.desc'
+                )
+                if rows:
+                    return rows
+            except Exception as e:
+                logger.debug(f"Get broadcast jobs error: {e}")
+        rows = sorted(self.local_broadcast_jobs.values(), key=lambda r: r['created_at'], reverse=True)
+        return rows[:limit]
+    
+    # ========== CONTENT POOL ==========
+    
+    async def get_content_pool(self) -> Dict[str, List[str]]:
+        """Persisted pre-generated content, one row per pool key"""
+        if self.connected and self.client:
+            try:
+                rows = await self.client.select('content_pool', 'key,items')
+                if rows:
+                    pool = {}
+                    for row in rows:
+                        items = row.get('items') or []
+                        if isinstance(items, str):
+                            try:
+                                items = json.loads(items)
+                            except ValueError:
+                                items = []
+                        pool[row['key']] = items if isinstance(items, list) else []
+                    return pool
+            except Exception as e:
+                logger.debug(f"Get content pool error: {e}")
+        return {k: list(v) for k, v in self.local_content_pool.items()}
+    
+    async def save_content_pool(self, key: str, items: List[str]):
+        """Upsert one pool's items (keyed by pool key)"""
+        if self.connected and self.client:
+            if await self.client.upsert('content_pool', {
+                'key': key,
+                'items': json.dumps(items, ensure_ascii=False),
+                'updated_at': datetime.now(timezone.utc).isoformat()
+            }):
+                return
+        self.local_content_pool[key] = list(items)
+    
     # ========== ACTIVITY LOGGING ==========
     
     async def log_user_activity(self, user_id: int, activity_type: str):
@@ -1273,6 +2431,7 @@ class RateLimiter:
         self.requests = defaultdict(lambda: {'minute': deque(), 'day': deque()})
         self.cooldowns: Dict[int, datetime] = {}
         self.group_cooldowns: Dict[int, datetime] = {}  # Per-user group cooldown
+        self.say_requests: Dict[int, deque] = defaultdict(deque)  # /say per-user window
         self.lock = threading.Lock()
         self._last_cleanup = datetime.now(timezone.utc)
     
@@ -1319,6 +2478,18 @@ class RateLimiter:
             self.group_cooldowns[user_id] = now
             return True
     
+    def check_say(self, user_id: int) -> bool:
+        """Per-user /say limit (synthesis is the expensive part)"""
+        now = datetime.now(timezone.utc)
+        with self.lock:
+            reqs = self.say_requests[user_id]
+            while reqs and reqs[0] < now - timedelta(minutes=1):
+                reqs.popleft()
+            if len(reqs) >= Config.SAY_MAX_PER_MINUTE:
+                return False
+            reqs.append(now)
+            return True
+    
     def get_daily_total(self) -> int:
         """Get total daily requests"""
         return sum(len(r['day']) for r in self.requests.values())
@@ -1343,6 +2514,11 @@ class RateLimiter:
             for uid in expired_req:
                 del self.requests[uid]
             
+            expired_say = [uid for uid, r in self.say_requests.items()
+                           if not r or (now - r[-1]).total_seconds() > 60]
+            for uid in expired_say:
+                del self.say_requests[uid]
+            
             self._last_cleanup = now
 
 
@@ -1417,10 +2593,11 @@ class ContentFilter:
         r'\b\d{12,16}\b',
     ]
     
+    # An optional (?P<target>...) group captures the linked/mentioned username
     SPAM_LINK_PATTERNS = [
         r'https?://(?:t\.me|telegram\.me|t\.co)/\+',
-        r'https?://(?:www\.)?t\.me/',
-        r'@(\w{5,})',
+        r'https?://(?:www\.)?t\.me/(?P<target>\w*)',
+        r'@(?P<target>\w{5,})',
     ]
     
     DISTRESS_KEYWORDS = [
@@ -1428,17 +2605,387 @@ class ContentFilter:
         'hurt myself', 'no reason to live'
     ]
     
-    @staticmethod
-    def detect_spam_link(text: str) -> bool:
+    # Scan verdicts, most severe first
+    DISTRESS = 'distress'
+    SPAM = 'spam'
+    SENSITIVE = 'sensitive'
+    CLEAN = 'clean'
+    
+    # Our own bots may be mentioned/linked freely
+    ALLOWED_USERNAMES = frozenset(
+        [Config.BOT_USERNAME.lower().lstrip('@')] + [p.username.lower() for p in PERSONAS if p.username]
+    )
+    
+    # All patterns compiled into one alternation -> one pass over the text.
+    # Group names map each alternative back to its verdict; each spam
+    # pattern's `target` group is renamed so the names stay unique.
+    _SCANNER = re.compile(
+        '|'.join(
+            [f"(?P<distress>{'|'.join(re.escape(k) for k in DISTRESS_KEYWORDS)})"]
+            + [f"(?P<spam{i}>{p.replace('(?P<target>', f'(?P<target{i}>')})"
+               for i, p in enumerate(SPAM_LINK_PATTERNS)]
+            + [f"(?P<sensitive{i}>{p})" for i, p in enumerate(SENSITIVE_PATTERNS)]
+        )
+    )
+    _SPAM_TARGETS = {f"spam{i}": f"target{i}" for i, p in enumerate(SPAM_LINK_PATTERNS)
+                     if '(?P<target>' in p}
+    _SEVERITY = {DISTRESS: 3, SPAM: 2, SENSITIVE: 1, CLEAN: 0}
+    
+    @classmethod
+    def allow_username(cls, username: str):
+        """Whitelist one of our bots learned at runtime (persona without a configured username)"""
+        cls.ALLOWED_USERNAMES = cls.ALLOWED_USERNAMES | {username.lower().lstrip('@')}
+    
+    @classmethod
+    def scan(cls, text: str) -> str:
+        """Classify a message in one pass: distress, spam, sensitive or clean"""
+        if not text:
+            return cls.CLEAN
+        
+        verdict = cls.CLEAN
+        for match in cls._SCANNER.finditer(text.lower()):
+            kind = match.lastgroup
+            if kind == 'distress':
+                return cls.DISTRESS
+            if kind.startswith('spam'):
+                target_group = cls._SPAM_TARGETS.get(kind)
+                target = match.group(target_group) if target_group else None
+                if target and target in cls.ALLOWED_USERNAMES:
+                    continue
+                verdict = cls.SPAM
+            elif cls._SEVERITY[verdict] < cls._SEVERITY[cls.SENSITIVE]:
+                verdict = cls.SENSITIVE
+        return verdict
+    
+    @classmethod
+    def detect_spam_link(cls, text: str) -> bool:
         """Detect promotional links"""
-        text_lower = text.lower()
-        for pattern in ContentFilter.SPAM_LINK_PATTERNS:
-            if re.search(pattern, text_lower):
-                # Check if it's a legitimate mention of bot
-                if '@askkavyabot' in text_lower or 'askkavyabot' in text_lower:
-                    return False
+        return cls.scan(text) == cls.SPAM
+
+# ============================================================================
+# 📎 TELEGRAM FILE_ID STORE
+# ============================================================================
+
+class TelegramFileIdStore:
+    """Persisted content-key -> Telegram file_id map (ids are per bot)"""
+    
+    def __init__(self, path: str = None, max_entries: int = None):
+        self.path = path or Config.TELEGRAM_FILE_ID_FILE
+        self.max_entries = max_entries or Config.TELEGRAM_FILE_ID_MAX
+        self._ids: OrderedDict = OrderedDict()
+        self._dirty = False
+        self._load()
+    
+    @staticmethod
+    def _slot(bot_id: int, key: str) -> str:
+        return f"{bot_id}:{key}"
+    
+    def get(self, bot_id: int, key: str) -> Optional[str]:
+        slot = self._slot(bot_id, key)
+        file_id = self._ids.get(slot)
+        if file_id:
+            self._ids.move_to_end(slot)
+        return file_id
+    
+    def put(self, bot_id: int, key: str, file_id: str):
+        if not file_id:
+            return
+        slot = self._slot(bot_id, key)
+        self._ids[slot] = file_id
+        self._ids.move_to_end(slot)
+        while len(self._ids) > self.max_entries:
+            self._ids.popitem(last=False)
+        self._dirty = True
+    
+    def drop(self, bot_id: int, key: str):
+        """Forget a file_id Telegram no longer accepts"""
+        if self._ids.pop(self._slot(bot_id, key), None):
+            self._dirty = True
+    
+    def __len__(self) -> int:
+        return len(self._ids)
+    
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for slot, file_id in data.items():
+                if isinstance(file_id, str):
+                    self._ids[slot] = file_id
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"⚠️ file_id store load error: {e}")
+    
+    def save(self):
+        """Persist atomically (only if changed)"""
+        if not self._dirty:
+            return
+        try:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._ids, f)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+        except Exception as e:
+            logger.warning(f"⚠️ file_id store save error: {e}")
+
+
+telegram_file_ids = TelegramFileIdStore()
+
+
+class MediaRegistry:
+    """Static images: fetched by Telegram from the URL once, then sent by file_id"""
+    
+    ASSETS = {
+        'start': "https://images.unsplash.com/photo-1532012197267-da84d127e765?w=800&q=80",  # Books & pen
+        'diary_locked': "https://images.unsplash.com/photo-1517639493569-5666a7488662?w=600&q=80&blur=50",
+        'diary_unlocked': "https://images.unsplash.com/photo-1517639493569-5666a7488662?w=800&q=80",
+    }
+    
+    def __init__(self, store: TelegramFileIdStore):
+        self.store = store
+        self._upload_locks: Dict[Tuple[int, str], asyncio.Lock] = defaultdict(asyncio.Lock)
+    
+    def _key(self, name: str) -> str:
+        return f"media:{name}:{self.ASSETS[name]}"  # New URL = new upload
+    
+    @staticmethod
+    def _photo_id(message) -> Optional[str]:
+        photos = getattr(message, 'photo', None)
+        return photos[-1].file_id if photos else None
+    
+    async def _with_media(self, bot, name: str, action):
+        """Run action(media) with the cached file_id, uploading from the URL only once"""
+        key = self._key(name)
+        file_id = self.store.get(bot.id, key)
+        if file_id:
+            try:
+                return await action(file_id)
+            except BadRequest as e:
+                if 'file' not in str(e).lower():
+                    raise  # Chat-specific problem, the id is fine
+                logger.info(f"📎 file_id for '{name}' rejected, re-uploading")
+                self.store.drop(bot.id, key)
+        
+        # One upload per asset; concurrent senders wait for its file_id
+        async with self._upload_locks[(bot.id, name)]:
+            file_id = self.store.get(bot.id, key)
+            if file_id:
+                return await action(file_id)
+            message = await action(self.ASSETS[name])
+            file_id = self._photo_id(message)
+            if file_id:
+                self.store.put(bot.id, key, file_id)
+                self.store.save()  # Rare write; survive a crash before the hourly flush
+            return message
+    
+    async def send_photo(self, bot, name: str, chat_id: int, **kwargs):
+        return await self._with_media(
+            bot, name, lambda media: bot.send_photo(chat_id=chat_id, photo=media, **kwargs)
+        )
+    
+    async def edit_media(self, bot, query, name: str, caption: str):
+        return await self._with_media(
+            bot, name, lambda media: query.edit_message_media(
+                media=InputMediaPhoto(media=media, caption=caption, parse_mode=ParseMode.HTML)
+            )
+        )
+
+
+media_registry = MediaRegistry(telegram_file_ids)
+
+# ============================================================================
+# 🎤 TTS EXECUTOR (bounded Edge-TTS concurrency)
+# ============================================================================
+
+class TTSExecutor:
+    """Caps concurrent Edge-TTS sockets; waiting jobs have a deadline"""
+    
+    LATENCY_WINDOW = 200
+    
+    def __init__(self, max_concurrency: int = None, max_queue: int = None, queue_timeout: float = None):
+        self.max_concurrency = max_concurrency or Config.TTS_MAX_CONCURRENCY
+        self.max_queue = max_queue or Config.TTS_MAX_QUEUE
+        self.queue_timeout = queue_timeout or Config.TTS_QUEUE_TIMEOUT
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self.waiting = 0
+        self.active = 0
+        self.counters = {'completed': 0, 'failed': 0, 'rejected': 0, 'timed_out': 0}
+        self._wait_ms: deque = deque(maxlen=self.LATENCY_WINDOW)
+        self._synth_ms: deque = deque(maxlen=self.LATENCY_WINDOW)
+    
+    async def submit(self, func, *args) -> Optional[bytes]:
+        """Run func(*args) in a free slot (None if the queue is full or the wait expires)"""
+        queued_at = perf_counter_ns()
+        if not self._slots.locked():
+            await self._slots.acquire()  # Free slot - no queueing
+        else:
+            if self.waiting >= self.max_queue:
+                self.counters['rejected'] += 1
+                logger.warning(f"🎤 TTS queue full ({self.waiting}), request rejected")
+                return None
+            
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.counters['timed_out'] += 1
+                logger.warning(f"🎤 TTS request expired after {self.queue_timeout}s in queue")
+                return None
+            finally:
+                self.waiting -= 1
+        
+        started_at = perf_counter_ns()
+        self._wait_ms.append((started_at - queued_at) / 1e6)
+        self.active += 1
+        try:
+            result = await func(*args)
+            self.counters['completed'] += 1
+            return result
+        except Exception:
+            self.counters['failed'] += 1
+            raise
+        finally:
+            self.active -= 1
+            self._slots.release()
+            self._synth_ms.append((perf_counter_ns() - started_at) / 1e6)
+    
+    async def submit_all(self, func, arg_lists: List[Tuple]) -> Optional[List[bytes]]:
+        """Run func over several arg tuples in parallel, admitted as one request
+        
+        Rejected up front if the parts can't all get a slot or a queue place;
+        the first part that is rejected, expires or fails cancels its siblings.
+        """
+        free = max(0, self.max_concurrency - self.active) + max(0, self.max_queue - self.waiting)
+        if len(arg_lists) > free:
+            self.counters['rejected'] += 1
+            logger.warning(f"🎤 TTS queue full ({self.waiting}), {len(arg_lists)}-part request rejected")
+            return None
+        
+        tasks = [asyncio.create_task(self.submit(func, *args)) for args in arg_lists]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                if not await next_done:
+                    return None
+            return [task.result() for task in tasks]
+        finally:
+            pending = [task for task in tasks if not task.done()]
+            for task in pending:
+                task.cancel()
+            if pending:
+                # A part handed a slot just as it was cancelled can swallow the
+                # cancel inside wait_for - let it step once, then cancel again
+                await asyncio.sleep(0)
+                for task in pending:
+                    task.cancel()
+    
+    @staticmethod
+    def _summary(samples: deque) -> Dict[str, float]:
+        if not samples:
+            return {'avg': 0.0, 'p95': 0.0}
+        ordered = sorted(samples)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        return {'avg': round(sum(ordered) / len(ordered), 1), 'p95': round(p95, 1)}
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'queue_depth': self.waiting,
+            'active': self.active,
+            'max_concurrency': self.max_concurrency,
+            **self.counters,
+            'queue_wait_ms': self._summary(self._wait_ms),
+            'synthesis_ms': self._summary(self._synth_ms)
+        }
+
+
+# ============================================================================
+# 🎤 VOICE CATALOGUE (cached Edge-TTS voice list)
+# ============================================================================
+
+class VoiceCatalogue:
+    """Edge-TTS voice list cached in memory + on disk, indexed by locale/gender"""
+    
+    def __init__(self, path: str = None, ttl: int = None):
+        self.path = path or Config.VOICE_CATALOGUE_FILE
+        self.ttl = ttl or Config.VOICE_CATALOGUE_TTL
+        self.voices: List[Dict] = []
+        self.by_name: Dict[str, Dict] = {}
+        self.by_locale: Dict[str, List[Dict]] = defaultdict(list)
+        self.by_gender: Dict[str, List[Dict]] = defaultdict(list)
+        self.fetched_at = 0.0
+        self._lock = asyncio.Lock()
+        self._load()
+    
+    def _index(self, voices: List[Dict], fetched_at: float):
+        self.voices = [v for v in voices if isinstance(v, dict) and v.get('ShortName')]
+        self.by_name = {v['ShortName']: v for v in self.voices}
+        self.by_locale = defaultdict(list)
+        self.by_gender = defaultdict(list)
+        for v in self.voices:
+            self.by_locale[v.get('Locale', '')].append(v)
+            self.by_gender[v.get('Gender', '').lower()].append(v)
+        self.fetched_at = fetched_at
+    
+    def is_fresh(self) -> bool:
+        return bool(self.voices) and datetime.now(timezone.utc).timestamp() - self.fetched_at < self.ttl
+    
+    async def refresh(self, force: bool = False) -> bool:
+        """Fetch the list from Edge only when the cached copy is stale"""
+        if self.is_fresh() and not force:
+            return True
+        
+        async with self._lock:
+            if self.is_fresh() and not force:
                 return True
-        return False
+            try:
+                voices = await asyncio.wait_for(
+                    edge_tts.list_voices(), timeout=Config.VOICE_CATALOGUE_FETCH_TIMEOUT
+                )
+                self._index(voices, datetime.now(timezone.utc).timestamp())
+                self._save()
+                logger.info(f"🎤 Voice catalogue refreshed ({len(self.voices)} voices)")
+            except asyncio.TimeoutError:
+                logger.warning(f"⚠️ Voice catalogue fetch timed out after {Config.VOICE_CATALOGUE_FETCH_TIMEOUT}s (using cached copy)")
+            except Exception as e:
+                logger.warning(f"⚠️ Voice catalogue fetch error (using cached copy): {e}")
+        return bool(self.voices)
+    
+    def get(self, short_name: str) -> Optional[Dict]:
+        return self.by_name.get(short_name)
+    
+    def find(self, locale: Optional[str] = None, gender: Optional[str] = None) -> List[Dict]:
+        """Voices for a locale (e.g. 'hi-IN') and/or gender ('female'/'male')"""
+        if locale:
+            voices = self.by_locale.get(locale, [])
+            if gender:
+                voices = [v for v in voices if v.get('Gender', '').lower() == gender.lower()]
+            return voices
+        if gender:
+            return self.by_gender.get(gender.lower(), [])
+        return self.voices
+    
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self._index(data.get('voices', []), float(data.get('fetched_at', 0)))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"⚠️ Voice catalogue load error: {e}")
+    
+    def _save(self):
+        try:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'fetched_at': self.fetched_at, 'voices': self.voices}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"⚠️ Voice catalogue save error: {e}")
+
+
+voice_catalogue = VoiceCatalogue()
 
 # ============================================================================
 # 🎤 VOICE GENERATOR - EDGE TTS (Slightly different settings)
@@ -1466,51 +3013,297 @@ class VoiceGenerator:
         'neutral': {'rate': '+0%', 'pitch': '+0Hz'}
     }
     
-    def __init__(self):
+    def __init__(self, cache_dir: str = None, executor: TTSExecutor = None):
         self.default_voice = self.VOICES['female']
+        self.substitutes: Dict[str, str] = {}  # Voice missing from the catalogue -> replacement
+        self.cache_dir = cache_dir or Config.TTS_CACHE_DIR
+        self.executor = executor or TTSExecutor()
+        self.ffmpeg = shutil.which('ffmpeg')  # Needed for OGG/Opus output
+        self._voices_validated = False
+        self._memory: OrderedDict = OrderedDict()  # key -> mp3 bytes (LRU)
+        self._memory_bytes = 0
+        self._disk: OrderedDict = OrderedDict()  # key -> size, oldest first
+        self._disk_bytes = 0
+        self.cache_stats = {
+            'memory_hits': 0, 'disk_hits': 0, 'misses': 0,
+            'opus_encoded': 0, 'opus_failed': 0, 'opus_bytes_saved': 0
+        }
+        self._scan_disk()
+        if Config.VOICE_OUTPUT_FORMAT == 'opus' and not self.ffmpeg:
+            logger.warning("⚠️ ffmpeg not found - voice notes fall back to mp3")
         logger.info("🎤 Voice Generator initialized (Edge-TTS)")
     
+    # ---------- settings & keys ----------
+    
+    def resolve(
+        self,
+        mood: str = 'neutral',
+        voice_type: str = 'female',
+        voice: Optional[str] = None,
+        rate: Optional[str] = None,
+        pitch: Optional[str] = None
+    ) -> Tuple[str, str, str]:
+        """(voice, rate, pitch) actually used for a request (rate/pitch override the mood)"""
+        voice = voice or self.VOICES.get(voice_type, self.default_voice)
+        voice = self.substitutes.get(voice, voice)
+        settings = self.MOOD_SETTINGS.get(mood, self.MOOD_SETTINGS['neutral'])
+        return voice, rate or settings['rate'], pitch or settings['pitch']
+    
+    @staticmethod
+    def cache_key(text: str, voice: str, rate: str, pitch: str, fmt: str = 'mp3') -> str:
+        """Content address of a synthesized clip"""
+        raw = '\x1f'.join((text.strip(), voice, rate, pitch, fmt))
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+    
+    def format_for(self, voice: str) -> str:
+        """Output format for a voice ('opus' needs ffmpeg, else mp3)"""
+        fmt = Config.VOICE_FORMAT_OVERRIDES.get(voice, Config.VOICE_OUTPUT_FORMAT)
+        if fmt == 'opus' and self.ffmpeg:
+            return 'opus'
+        return 'mp3'
+    
+    def key_for(
+        self,
+        text: str,
+        mood: str = 'neutral',
+        voice_type: str = 'female',
+        voice: Optional[str] = None,
+        rate: Optional[str] = None,
+        pitch: Optional[str] = None
+    ) -> str:
+        voice, rate, pitch = self.resolve(mood, voice_type, voice, rate, pitch)
+        return self.cache_key(text, voice, rate, pitch, self.format_for(voice))
+    
+    # ---------- memory tier ----------
+    
+    def _memory_get(self, key: str) -> Optional[bytes]:
+        data = self._memory.get(key)
+        if data is not None:
+            self._memory.move_to_end(key)
+        return data
+    
+    def _memory_put(self, key: str, data: bytes):
+        if len(data) > Config.TTS_MEMORY_CACHE_BYTES:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old)
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > Config.TTS_MEMORY_CACHE_BYTES:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+    
+    # ---------- disk tier ----------
+    
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.tts")
+    
+    def _scan_disk(self):
+        """Index existing cache files, oldest first"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            entries = []
+            for entry in os.scandir(self.cache_dir):
+                if entry.is_file() and entry.name.endswith('.tts'):
+                    st = entry.stat()
+                    entries.append((st.st_mtime, entry.name[:-4], st.st_size))
+            for _, key, size in sorted(entries):
+                self._disk[key] = size
+                self._disk_bytes += size
+            self._evict_disk()
+        except Exception as e:
+            logger.warning(f"⚠️ TTS disk cache scan error: {e}")
+    
+    def _evict_disk(self):
+        while self._disk_bytes > Config.TTS_DISK_CACHE_BYTES and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+    
+    def _disk_read(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)  # Keep recency across restarts
+            return data
+        except OSError:
+            return None
+    
+    def _disk_write(self, key: str, data: bytes):
+        try:
+            tmp_path = f"{self._path(key)}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            logger.debug(f"TTS disk cache write error: {e}")
+    
+    async def _disk_get(self, key: str) -> Optional[bytes]:
+        if key not in self._disk:
+            return None
+        data = await asyncio.to_thread(self._disk_read, key)
+        if data is None:
+            self._disk_bytes -= self._disk.pop(key, 0)
+            return None
+        self._disk.move_to_end(key)
+        return data
+    
+    async def _disk_put(self, key: str, data: bytes):
+        if len(data) > Config.TTS_DISK_CACHE_BYTES:
+            return
+        await asyncio.to_thread(self._disk_write, key, data)
+        self._disk_bytes += len(data) - self._disk.pop(key, 0)
+        self._disk[key] = len(data)
+        self._evict_disk()
+    
+    # ---------- synthesis ----------
+    
+    _SENTENCE_RE = re.compile(r'(?<=[.!?।])\s+')
+    
+    @classmethod
+    def split_chunks(cls, text: str, limit: int = None) -> List[str]:
+        """Pack sentences into chunks of at most `limit` chars"""
+        limit = limit or Config.TTS_CHUNK_CHARS
+        text = text.strip()
+        if len(text) <= limit:
+            return [text]
+        
+        pieces = []
+        for sentence in cls._SENTENCE_RE.split(text):
+            while len(sentence) > limit:
+                # Overlong sentence - cut at the last space before the limit
+                cut = sentence.rfind(' ', 0, limit)
+                cut = cut if cut > 0 else limit
+                pieces.append(sentence[:cut].strip())
+                sentence = sentence[cut:].strip()
+            if sentence:
+                pieces.append(sentence)
+        
+        chunks = []
+        for piece in pieces:
+            if chunks and len(chunks[-1]) + 1 + len(piece) <= limit:
+                chunks[-1] = f"{chunks[-1]} {piece}"
+            else:
+                chunks.append(piece)
+        return chunks
+    
+    async def _synthesize(self, text: str, voice: str, rate: str, pitch: str) -> bytes:
+        """Raw Edge-TTS call (no caching)"""
+        audio_buffer = BytesIO()
+        communicate = edge_tts.Communicate(
+            text=text,
+            voice=voice,
+            rate=rate,
+            pitch=pitch
+        )
+        async for chunk in communicate.stream():
+            if chunk["type"] == "audio":
+                audio_buffer.write(chunk["data"])
+        return audio_buffer.getvalue()
+    
+    async def _to_opus(self, mp3: bytes) -> bytes:
+        """Transcode to OGG/Opus (Telegram's native voice format); mp3 on failure"""
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                self.ffmpeg, '-hide_banner', '-loglevel', 'error',
+                '-i', 'pipe:0', '-vn', '-c:a', 'libopus', '-b:a', Config.VOICE_OPUS_BITRATE,
+                '-application', 'voip', '-f', 'ogg', 'pipe:1',
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            opus, err = await proc.communicate(mp3)
+            if proc.returncode != 0 or not opus:
+                self.ffmpeg = None  # Broken build (e.g. no libopus) - don't spawn it for every note
+                raise RuntimeError(err.decode('utf-8', 'ignore').strip() or f"exit {proc.returncode}")
+            self.cache_stats['opus_encoded'] += 1
+            self.cache_stats['opus_bytes_saved'] += len(mp3) - len(opus)
+            return opus
+        except Exception as e:
+            self.cache_stats['opus_failed'] += 1
+            logger.warning(f"🎤 Opus encode failed, sending mp3{'' if self.ffmpeg else ' from now on'}: {e}")
+            return mp3
+    
+    @staticmethod
+    def _wrap(data: bytes) -> BytesIO:
+        """BytesIO with a filename so Telegram gets the right mime type"""
+        audio = BytesIO(data)
+        audio.name = 'voice.ogg' if data[:4] == b'OggS' else 'voice.mp3'
+        return audio
+    
     async def generate(
         self, 
         text: str, 
         mood: str = 'neutral',
-        voice_type: str = 'female'
+        voice_type: str = 'female',
+        voice: Optional[str] = None,
+        rate: Optional[str] = None,
+        pitch: Optional[str] = None
     ) -> Optional[BytesIO]:
-        """Generate voice audio from text"""
+        """Generate voice audio from text (voice = explicit ShortName, e.g. per persona)"""
         
         if not text or len(text.strip()) < 5:
             return None
         
         try:
-            voice = self.VOICES.get(voice_type, self.default_voice)
-            settings = self.MOOD_SETTINGS.get(mood, self.MOOD_SETTINGS['neutral'])
-            
-            audio_buffer = BytesIO()
+            voice, rate, pitch = self.resolve(mood, voice_type, voice, rate, pitch)
+            fmt = self.format_for(voice)
+            key = self.cache_key(text, voice, rate, pitch, fmt)
             
-            communicate = edge_tts.Communicate(
-                text=text,
-                voice=voice,
-                rate=settings['rate'],
-                pitch=settings['pitch']
-            )
+            data = self._memory_get(key)
+            if data is not None:
+                self.cache_stats['memory_hits'] += 1
+                return self._wrap(data)
             
-            async for chunk in communicate.stream():
-                if chunk["type"] == "audio":
-                    audio_buffer.write(chunk["data"])
+            data = await self._disk_get(key)
+            if data is not None:
+                self.cache_stats['disk_hits'] += 1
+                self._memory_put(key, data)
+                return self._wrap(data)
             
-            audio_buffer.seek(0)
+            self.cache_stats['misses'] += 1
+            chunks = self.split_chunks(text)
+            if len(chunks) == 1:
+                data = await self.executor.submit(self._synthesize, text, voice, rate, pitch)
+            else:
+                # MP3 frames concatenate cleanly; latency ~ the slowest chunk
+                parts = await self.executor.submit_all(
+                    self._synthesize, [(chunk, voice, rate, pitch) for chunk in chunks]
+                )
+                data = b''.join(parts) if parts else None
             
             # Check if audio was generated
-            if audio_buffer.getbuffer().nbytes > 0:
-                logger.debug(f"🎤 Voice generated: {len(text)} chars, mood={mood}")
-                return audio_buffer
-            else:
+            if not data:
                 return None
+            
+            if fmt == 'opus':
+                data = await self._to_opus(data)
+            
+            self._memory_put(key, data)
+            await self._disk_put(key, data)
+            logger.debug(f"🎤 Voice generated: {len(text)} chars, mood={mood}, {fmt}")
+            return self._wrap(data)
                 
         except Exception as e:
             logger.error(f"🎤 Voice generation error: {e}")
             return None
     
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.cache_stats,
+            'memory_items': len(self._memory),
+            'memory_bytes': self._memory_bytes,
+            'disk_items': len(self._disk),
+            'disk_bytes': self._disk_bytes,
+            'file_ids': len(telegram_file_ids),
+            'executor': self.executor.stats()
+        }
+    
     def should_send_voice(
         self, 
         text: str, 
@@ -1542,62 +3335,110 @@ class VoiceGenerator:
         return random.random() < Config.VOICE_REPLY_CHANCE
     
     @staticmethod
-    async def list_available_voices() -> List[Dict]:
-        """List all available Hindi voices"""
-        try:
-            voices = await edge_tts.list_voices()
-            hindi_voices = [v for v in voices if v['Locale'].startswith('hi-IN')]
-            return hindi_voices
-        except:
-            return []
-
-
-# ✅ Initialize Voice Generator
-voice_generator = VoiceGenerator()
-    
+    async def list_available_voices(locale: str = 'hi-IN') -> List[Dict]:
+        """List available voices for a locale (Hindi by default)"""
+        await voice_catalogue.refresh()
+        return voice_catalogue.find(locale=locale)
+    
+    async def validate_voices(self, extra: List[str] = None):
+        """Check VOICES (+ persona voices) against the catalogue once at startup"""
+        if self._voices_validated:
+            return
+        self._voices_validated = True  # Personas share one generator
+        if not await voice_catalogue.refresh():
+            return
+        
+        male = {self.VOICES['male'], self.VOICES['english_m']}
+        for name in set(self.VOICES.values()) | set(extra or []):
+            if voice_catalogue.get(name):
+                continue
+            gender = 'male' if name in male else 'female' if name in self.VOICES.values() else None
+            fallback = self._fallback_for(name, gender)
+            if fallback:
+                self.substitutes[name] = fallback  # resolve() swaps it in for every caller
+                logger.warning(f"⚠️ Voice '{name}' not in Edge-TTS catalogue - using {fallback}")
+            else:
+                logger.warning(f"⚠️ Voice '{name}' not in Edge-TTS catalogue")
+    
+    @staticmethod
+    def _fallback_for(name: str, gender: Optional[str]) -> Optional[str]:
+        """Closest catalogue voice: same locale + gender, same locale, then Hindi female"""
+        locale = '-'.join(name.split('-')[:2])
+        for candidates in (voice_catalogue.find(locale, gender) if gender else [],
+                           voice_catalogue.find(locale),
+                           voice_catalogue.find('hi-IN', 'female')):
+            if candidates:
+                return candidates[0]['ShortName']
+        return None
+
+
+# ✅ Initialize Voice Generator
+voice_generator = VoiceGenerator()
+    
 # ============================================================================
 # AI ASSISTANT - SILLYTAVERN STYLE (KavyaAI)
 # ============================================================================
 
-class KavyaAI:
-    """SillyTavern-style AI with Character Cards and World Info - Formal Persona"""
+class GroqKeyPool:
+    """Groq keys + clients shared by every persona hosted in the process"""
     
-    def __init__(self):
-        self.keys = Config.GROQ_API_KEYS_LIST
+    def __init__(self, keys: List[str]):
+        self.keys = keys
         self.current_index = 0
+        self._clients: Dict[int, AsyncOpenAI] = {}  # One pooled client per key
         self.client = None
-        self.character = CharacterCard()
-        self.world_info = WorldInfo()
-        self.prompt_builder = PromptBuilder()
+        self.last_user_call_at: Optional[datetime] = None  # Any persona, any user
         self._initialize_client()
-        logging.info(f"🚀 AI initialized with SillyTavern character: {self.character.name}")
-
+    
     def _initialize_client(self):
-        """Initialize Groq client"""
+        """Initialize (or reuse) the Groq client for the current key"""
         if not self.keys: return
-        key = self.keys[self.current_index]
-        self.client = AsyncOpenAI(
-            base_url="https://api.groq.com/openai/v1",
-            api_key=key
-        )
-        masked = key[:6] + "..." + key[-4:]
-        logging.info(f"🔑 Using Groq Key: {masked}")
-
-    def _rotate_key(self):
+        client = self._clients.get(self.current_index)
+        if client is None:
+            key = self.keys[self.current_index]
+            client = AsyncOpenAI(
+                base_url="https://api.groq.com/openai/v1",
+                api_key=key
+            )
+            self._clients[self.current_index] = client
+            masked = key[:6] + "..." + key[-4:]
+            logging.info(f"🔑 Using Groq Key: {masked}")
+        self.client = client
+    
+    def rotate(self) -> bool:
         """Rotate key on failure"""
         if len(self.keys) <= 1: return False
         self.current_index = (self.current_index + 1) % len(self.keys)
         self._initialize_client()
         return True
+
+
+groq_key_pool = GroqKeyPool(Config.GROQ_API_KEYS_LIST)
+
+
+class KavyaAI:
+    """SillyTavern-style AI with Character Cards and World Info - Formal Persona"""
+    
+    def __init__(self, card_path: str = "kavya_card.yaml", key_pool: GroqKeyPool = None):
+        self.key_pool = key_pool or groq_key_pool
+        self.prompt_builder = PromptBuilder(card_path)
+        self.scope: Optional[str] = None  # Persona.scope - whose history/memories to read
+        logging.info(f"🚀 AI initialized with SillyTavern character: {self.character.name}")
+
+    @property
+    def character(self) -> CharacterCard:
+        return self.prompt_builder.character
     
-    async def _call_gpt(self, messages, max_tokens=250, temperature=0.7):
+    async def _call_gpt(self, messages, max_tokens=None, temperature=0.7):
         """Call GPT with rotation - lower temperature for composed responses"""
-        if not self.client: self._initialize_client()
+        pool = self.key_pool
+        if not pool.client: pool._initialize_client()
+        max_tokens = max_tokens or Config.RESPONSE_MAX_TOKENS
         
-        attempts = len(self.keys)
+        attempts = len(pool.keys)
         for _ in range(attempts):
             try:
-                response = await self.client.chat.completions.create(
+                response = await pool.client.chat.completions.create(
                     model=Config.GROQ_MODEL,
                     messages=messages,
                     max_tokens=max_tokens, 
@@ -1608,7 +3449,7 @@ class KavyaAI:
                 return response.choices[0].message.content.strip()
             except Exception as e:
                 logging.warning(f"⚠️ Groq Error: {e}. Rotating key...")
-                if not self._rotate_key():
+                if not pool.rotate():
                     break
                 await asyncio.sleep(0.5)
         
@@ -1621,21 +3462,46 @@ class KavyaAI:
         
         if user_id:
             self._current_user_id = user_id
+        self.key_pool.last_user_call_at = datetime.now(timezone.utc)
+        
+        mood = mood or Mood.get_random_mood()
+        time_period = time_period or TimeAware.get_time_period()
+        
+        # Trivial messages ("hi", "good night"...) are served from cache
+        intent = None
+        if Config.CANNED_REPLY_ENABLED and not is_group:
+            intent = canned_replies.classify(user_message)
+            if intent:
+                cached = canned_replies.get(intent, time_period, user_name or "User",
+                                            persona=self.character.name)
+                if cached:
+                    return self._add_emotional_touch(cached, mood)
             
+        if intent:
+            # The reply becomes a variant shared by every user - build it from the
+            # card and time only (no history, memories or summary), in the base
+            # mood - the current mood's touch is added whenever it is served
+            memories, summary, history = [], '', []
+            prompt_mood = Mood.MOODS[0]
+        else:
+            memories, summary = await self._get_prompt_state(user_message)
+            history = context or []
+            prompt_mood = mood
+        
         # Build prompt using SillyTavern format
         messages = self.prompt_builder.build_prompt(
             user_name=user_name or "User",
-            chat_history=context or [],
+            chat_history=history,
             current_message=user_message,
-            mood=mood or Mood.get_random_mood(),
-            time_period=time_period or TimeAware.get_time_period(),
-            memories=await self._get_user_memories(user_name)
+            mood=prompt_mood,
+            time_period=time_period,
+            memories=memories,
+            world_context=db.get_world_info_context(user_message),
+            summary=summary
+        )
+        health_server.stats['prompt_tokens_est'] = (
+            health_server.stats.get('prompt_tokens_est', 0) + TokenEstimator.estimate_messages(messages)
         )
-        
-        # Add world info context
-        world_context = self.world_info.get_relevant_info(user_message)
-        if world_context:
-            messages[0]['content'] += f"\n\nWorld Context: {world_context}"
         
         reply = await self._call_gpt(messages)
         if not reply:
@@ -1646,59 +3512,40 @@ class KavyaAI:
         # Parse response SillyTavern style
         responses = self.prompt_builder.parse_response(reply, user_name or "User")
         
+        if intent:
+            canned_replies.put(intent, time_period, user_name or "User", responses,
+                               persona=self.character.name)
+        
         # Add gentle emotional touch based on mood (minimal emojis)
         if not is_group and len(responses) > 0:
             responses = self._add_emotional_touch(responses, mood)
         
         return responses
     
-    async def _get_user_memories(self, user_name: str) -> List[str]:
-        """Get active memories for user"""
+    async def _get_prompt_state(self, query: str) -> Tuple[List[str], str]:
+        """Get relevant memories and rolling summary with one preferences read"""
         user_id = getattr(self, '_current_user_id', None)
         if not user_id:
-            return []
+            return [], ''
         
         try:
+            if self.scope:
+                state = await db.get_persona_chat(user_id, self.scope)
+                memories = await db.get_relevant_memories(
+                    user_id, query, Config.MEMORY_TOP_K, persona=self.scope, state=state
+                )
+                return memories, state['summary']
             prefs = await db.get_user_preferences(user_id)
-            raw_memories = prefs.get('active_memories', [])
-            
-            clean_memories = []
-            for m in raw_memories:
-                if isinstance(m, dict):
-                    if m.get('status') == 'active' and m.get('note'):
-                        clean_memories.append(m['note'])
-                elif isinstance(m, str):
-                    clean_memories.append(m)
-            
-            return clean_memories
+            memories = await db.get_relevant_memories(user_id, query, Config.MEMORY_TOP_K, prefs=prefs)
         except Exception as e:
-            logger.debug(f"Memory fetch error: {e}")
-            return []
+            logger.debug(f"Prompt state fetch error: {e}")
+            return [], ''
+        
+        return memories, prefs.get('conversation_summary', '')
     
     def _add_emotional_touch(self, responses: List[str], mood: str) -> List[str]:
         """Add mood-based subtle expressions"""
-        mood_emojis = {
-            'composed': '🌸',
-            'thoughtful': '📝',
-            'reflective': '✨',
-            'calm': '🍃',
-            'stern': '⚡',
-            'gentle': '🌿'
-        }
-        
-        emoji = mood_emojis.get(mood, '🌸')
-        enhanced = []
-        
-        for i, response in enumerate(responses):
-            # Add emoji at end if not present and if appropriate
-            if not re.search(r'[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF]', response):
-                # Only add if it's not too formal
-                if random.random() > 0.6:
-                    response += f" {emoji}"
-            
-            enhanced.append(response)
-        
-        return enhanced
+        return response_pipeline.decorate(responses, mood)
     
     async def extract_important_info(self, user_message: str, user_id: int) -> str:
         """Extract important info using AI - same as Niyati"""
@@ -1723,21 +3570,395 @@ class KavyaAI:
             return note.replace("Event:", "").strip()
         return None
     
-    async def generate_shayari(self, mood="neutral"):
-        """Generate shayari - more traditional tone"""
+    def is_idle(self, seconds: int) -> bool:
+        """True if no user-facing LLM call happened in the last N seconds"""
+        last_call = self.key_pool.last_user_call_at
+        if last_call is None:
+            return True
+        return (datetime.now(timezone.utc) - last_call).total_seconds() >= seconds
+    
+    async def generate_shayari_raw(self, mood="neutral") -> Optional[str]:
+        """Live LLM call for a shayari (used by the content pool)"""
         prompt = f"Write a 2 line heart-touching Hinglish shayari for {mood} mood. Use formal language, no slang. Keep it emotional yet dignified."
         res = await self._call_gpt([{"role": "user", "content": prompt}])
-        return f"✨ {res} ✨" if res else "Wah! Khoob likha hai aapne."
+        if not res:
+            return res  # None = no key quota
+        return response_pipeline.clean(res, char_name=self.character.name) or ''
     
-    async def generate_geeta_quote(self):
-        """Generate Geeta quote - same"""
+    async def generate_geeta_quote_raw(self) -> Optional[str]:
+        """Live LLM call for a Geeta quote (used by the content pool)"""
         prompt = "Give a short Bhagavad Gita quote with Hinglish meaning. Keep it profound. Start with 🙏"
         res = await self._call_gpt([{"role": "user", "content": prompt}])
+        if not res:
+            return res  # None = no key quota
+        return response_pipeline.clean(res, char_name=self.character.name) or ''
+    
+    async def generate_shayari(self, mood="neutral"):
+        """Generate shayari - more traditional tone (served from pool when possible)"""
+        res = content_pool.take(ContentPool.shayari_key(mood))
+        if not res:
+            res = await self.generate_shayari_raw(mood)
+        return f"✨ {res} ✨" if res else "Wah! Khoob likha hai aapne."
+    
+    async def generate_geeta_quote(self):
+        """Generate Geeta quote - served from pool when possible"""
+        res = content_pool.take(ContentPool.GEETA_KEY)
+        if not res:
+            res = await self.generate_geeta_quote_raw()
         return res if res else "🙏 Karm kar, phal ki chinta mat kar."
 
 
+# ============================================================================
+# CONTENT POOL (Pre-generated shayari & Geeta quotes)
+# ============================================================================
+
+class ContentPool:
+    """Per-key pool of pre-generated items, refilled in idle periods and persisted via the DB"""
+    
+    GEETA_KEY = 'geeta'
+    RECENT_KEY = '_recent'
+    
+    def __init__(self):
+        self.pools: Dict[str, deque] = defaultdict(deque)
+        self.recent: deque = deque()
+        self._recent_set: set = set()
+        self._dirty: set = set()
+        # Only keys something actually serves get pre-filled (daily Geeta job);
+        # other keys join once a caller takes from them
+        self.consumers: set = {self.GEETA_KEY}
+        self._refill_lock = asyncio.Lock()
+    
+    @staticmethod
+    def shayari_key(mood: str) -> str:
+        return f"shayari:{mood or 'neutral'}"
+    
+    @staticmethod
+    def _normalize(text: str) -> str:
+        return ' '.join(text.lower().split())
+    
+    def _remember(self, norm: str):
+        """Track a served item so it isn't generated/served again soon"""
+        if norm in self._recent_set:
+            return
+        self.recent.append(norm)
+        self._recent_set.add(norm)
+        while len(self.recent) > Config.CONTENT_POOL_RECENT_SIZE:
+            self._recent_set.discard(self.recent.popleft())
+    
+    def _is_duplicate(self, key: str, norm: str) -> bool:
+        if norm in self._recent_set:
+            return True
+        return any(self._normalize(item) == norm for item in self.pools[key])
+    
+    def take(self, key: str) -> Optional[str]:
+        """Serve one item from memory (None if pool is empty)"""
+        self.consumers.add(key)
+        pool = self.pools.get(key)
+        if not pool:
+            return None
+        item = pool.popleft()
+        self._remember(self._normalize(item))
+        self._dirty.update((key, self.RECENT_KEY))
+        return item
+    
+    def add(self, key: str, text: str) -> bool:
+        """Add a generated item unless it was recently served or already pooled"""
+        if not text or not text.strip():
+            return False
+        text = text.strip()
+        norm = self._normalize(text)
+        if self._is_duplicate(key, norm):
+            return False
+        self.pools[key].append(text)
+        self._dirty.add(key)
+        return True
+    
+    def needs_refill(self, key: str) -> bool:
+        return len(self.pools.get(key, ())) < Config.CONTENT_POOL_LOW_WATERMARK
+    
+    def stats(self) -> Dict[str, int]:
+        return {key: len(self.pools.get(key, ())) for key in sorted(self.consumers)}
+    
+    async def refill(self, ai: 'KavyaAI'):
+        """Top up consumed pools below the low watermark while the bot is idle"""
+        if self._refill_lock.locked():
+            return
+        
+        async with self._refill_lock:
+            budget = Config.CONTENT_POOL_REFILL_BATCH
+            generated = 0
+            
+            for key in sorted(self.consumers):
+                if not self.needs_refill(key):
+                    continue
+                
+                while len(self.pools[key]) < Config.CONTENT_POOL_SIZE and budget > 0:
+                    # Back off as soon as real users start talking
+                    if not ai.is_idle(Config.CONTENT_POOL_IDLE_SECONDS):
+                        break
+                    
+                    budget -= 1
+                    if key == self.GEETA_KEY:
+                        res = await ai.generate_geeta_quote_raw()
+                    else:
+                        res = await ai.generate_shayari_raw(key.split(':', 1)[1])
+                    
+                    if res is None:
+                        # No key quota left - try again next run
+                        budget = 0
+                        break
+                    if self.add(key, res):
+                        generated += 1
+                
+                if budget <= 0:
+                    break
+            
+            if generated:
+                logger.info(f"📚 Content pool refilled with {generated} items")
+            await self.save()
+    
+    async def load(self):
+        """Load the persisted pool so restarts and deploys don't drain it"""
+        try:
+            stored = await db.get_content_pool()
+        except Exception as e:
+            logger.warning(f"⚠️ Content pool load error: {e}")
+            return
+        for key, items in stored.items():
+            if key == self.RECENT_KEY:
+                for norm in items:
+                    self._remember(norm)
+            else:
+                self.pools[key] = deque(i for i in items if isinstance(i, str))
+        if stored:
+            logger.info(f"📚 Content pool loaded ({sum(len(p) for p in self.pools.values())} items)")
+    
+    async def save(self):
+        """Persist only the keys that changed since the last save"""
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, set()
+        try:
+            for key in dirty:
+                items = self.recent if key == self.RECENT_KEY else self.pools.get(key, ())
+                await db.save_content_pool(key, list(items))
+        except Exception as e:
+            self._dirty |= dirty
+            logger.warning(f"⚠️ Content pool save error: {e}")
+
+
+# ============================================================================
+# ROLLING CONVERSATION SUMMARY
+# ============================================================================
+
+class ConversationSummarizer:
+    """Compresses older chat turns into a per-user rolling summary"""
+    
+    def __init__(self):
+        self._in_flight: set = set()
+    
+    def maybe_schedule(self, user_id: int, history_len: int, ai: 'KavyaAI' = None):
+        """Start a background summary if history crossed the threshold"""
+        if not Config.SUMMARY_ENABLED or history_len < Config.SUMMARY_TRIGGER_MESSAGES:
+            return
+        ai = ai or kavya_ai
+        key = (user_id, ai.scope)
+        if key in self._in_flight:
+            return
+        self._in_flight.add(key)
+        asyncio.create_task(self._run(user_id, ai, key))
+    
+    async def _run(self, user_id: int, ai: 'KavyaAI', key: Tuple):
+        try:
+            await self.summarize(user_id, ai)
+        except Exception as e:
+            logger.debug(f"Summary error for {user_id}: {e}")
+        finally:
+            self._in_flight.discard(key)
+    
+    async def summarize(self, user_id: int, ai: 'KavyaAI' = None):
+        """Fold everything except the most recent turns into the summary"""
+        ai = ai or kavya_ai
+        name = ai.character.name
+        messages = await db.get_user_context(user_id, persona=ai.scope)
+        if len(messages) < Config.SUMMARY_TRIGGER_MESSAGES:
+            return
+        
+        covered = messages[:-Config.SUMMARY_KEEP_RECENT]
+        previous = await db.get_conversation_summary(user_id, persona=ai.scope)
+        transcript = "\n".join(
+            f"{'User' if m.get('role') == 'user' else name}: {m.get('content', '')}"
+            for m in covered
+        )
+        
+        prompt = [
+            {"role": "system", "content": (
+                f"Summarize this chat between {name} and the user in 3-4 short lines. "
+                "Keep names, facts about the user, plans, feelings and open topics. "
+                "Merge with the previous summary, drop small talk. Plain text only."
+            )},
+            {"role": "user", "content": f"Previous summary: {previous or 'None'}\n\nNew turns:\n{transcript}"}
+        ]
+        
+        summary = await ai._call_gpt(prompt, max_tokens=Config.SUMMARY_MAX_TOKENS, temperature=0.3)
+        if not summary:
+            return
+        
+        await db.apply_conversation_summary(user_id, summary.strip(), covered, persona=ai.scope)
+        logger.info(f"🧾 Conversation summary updated for {user_id} ({len(covered)} turns folded)")
+
+
+# ============================================================================
+# CANNED REPLY CACHE (Trivial high-frequency messages)
+# ============================================================================
+
+class CannedReplyCache:
+    """Serves cached, time-aware replies for trivial intents
+    
+    Keyed by persona x intent x time period only - the current mood is
+    applied when a variant is served, so every mood shares the same pool.
+    """
+    
+    INTENTS = {
+        'greeting': ['hi', 'hello', 'hey', 'hlo', 'helo', 'namaste', 'namaskar', 'hii kavya', 'hi kavya', 'hello kavya'],
+        'good_morning': ['good morning', 'gm', 'gud morning', 'suprabhat', 'shubh prabhat'],
+        'good_night': ['good night', 'gn', 'gud night', 'shubh ratri', 'so ja', 'so jao'],
+        'what_doing': ['kya kar rahe ho', 'kya kar rahi ho', 'kya kr rhi ho', 'kya kr rahi ho', 'kya karti ho', 'wyd', 'kya chal raha hai'],
+        'how_are_you': ['kaise ho', 'kaisi ho', 'how are you', 'hru', 'kaisi hai', 'kaise hain aap', 'kaisi hain aap'],
+        'thanks': ['thanks', 'thank you', 'thanku', 'ty', 'shukriya', 'dhanyavad'],
+        'bye': ['bye', 'bye bye', 'tata', 'chalo bye', 'alvida'],
+    }
+    
+    _STRIP_RE = re.compile(r'[^\w\s]', re.UNICODE)
+    _REPEAT_RE = re.compile(r'(\w)\1{2,}')
+    
+    def __init__(self):
+        self._lookup: Dict[str, str] = {
+            phrase: intent for intent, phrases in self.INTENTS.items() for phrase in phrases
+        }
+        self.variants: Dict[Tuple[str, str, str], deque] = defaultdict(
+            lambda: deque(maxlen=Config.CANNED_REPLY_VARIANTS)
+        )
+        self.hits = 0
+        self.misses = 0
+    
+    def normalize(self, text: str) -> str:
+        """Lowercase, drop punctuation/emojis and squash stretched letters (hiiii -> hii)"""
+        text = self._STRIP_RE.sub(' ', text.lower())
+        text = self._REPEAT_RE.sub(r'\1\1', text)
+        return ' '.join(text.split())
+    
+    def classify(self, text: str) -> Optional[str]:
+        """Return the trivial intent for a message, or None"""
+        if not text or len(text) > 40:
+            return None
+        norm = self.normalize(text)
+        intent = self._lookup.get(norm)
+        if intent is None and norm.endswith(('ii', 'oo')):
+            intent = self._lookup.get(norm[:-1])
+        return intent
+    
+    def _fresh(self, key: Tuple[str, str, str]) -> List[Dict]:
+        now = datetime.now(timezone.utc)
+        bucket = self.variants.get(key)
+        if not bucket:
+            return []
+        while bucket and (now - bucket[0]['added_at']).total_seconds() > Config.CANNED_REPLY_TTL:
+            bucket.popleft()
+        return list(bucket)
+    
+    def get(self, intent: str, time_period: str, user_name: str,
+            persona: str = 'Kavya') -> Optional[List[str]]:
+        """Serve a cached variant, or None if the LLM should answer (miss/refresh)"""
+        key = (persona, intent, time_period)
+        fresh = self._fresh(key)
+        
+        if len(fresh) < Config.CANNED_REPLY_VARIANTS or random.random() < Config.CANNED_REPLY_REFRESH_CHANCE:
+            self.misses += 1
+            return None
+        
+        self.hits += 1
+        parts = random.choice(fresh)['parts']
+        return [p.replace('{{user}}', user_name) for p in parts]
+    
+    @staticmethod
+    def template(parts: List[str], user_name: str) -> List[str]:
+        """Replace the user's name with {{user}} (the name may start/end with emoji or punctuation)"""
+        if not user_name:
+            return list(parts)
+        name_re = re.compile(rf'(?<!\w){re.escape(user_name)}(?!\w)')
+        return [name_re.sub('{{user}}', p) for p in parts]
+    
+    def put(self, intent: str, time_period: str, user_name: str, parts: List[str],
+            persona: str = 'Kavya'):
+        """Store real LLM output as a variant (user name templated out)"""
+        if not parts:
+            return
+        self.variants[(persona, intent, time_period)].append({
+            'parts': self.template(parts, user_name),
+            'added_at': datetime.now(timezone.utc)
+        })
+    
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 3) if total else 0.0,
+            'buckets': len(self.variants)
+        }
+
+
 # Initialize AI
 kavya_ai = KavyaAI()
+content_pool = ContentPool()
+canned_replies = CannedReplyCache()
+conversation_summarizer = ConversationSummarizer()
+
+def get_ai(context: ContextTypes.DEFAULT_TYPE) -> KavyaAI:
+    """AI (card + prompt builder) of the persona that received this update"""
+    return context.bot_data.get('ai') or kavya_ai
+
+# ============================================================================
+# SHARED GROUP STATE (Personas / sister bots in the same group)
+# ============================================================================
+
+# chat_id -> {message_id: persona name that claimed the reply}
+group_speaker_lock: Dict[int, Dict[int, str]] = {}
+# chat_id -> recent replies by any persona
+shared_group_memory: Dict[int, deque] = defaultdict(
+    lambda: deque(maxlen=Config.SHARED_GROUP_MEMORY_SIZE)
+)
+
+
+def claim_group_turn(chat_id: int, message_id: int, persona_name: str) -> bool:
+    """Claim the right to answer a group message (first persona wins)"""
+    holder = group_speaker_lock.get(chat_id, {}).get(message_id)
+    if holder and holder != persona_name:
+        return False
+    group_speaker_lock[chat_id] = {message_id: persona_name}
+    return True
+
+
+async def add_to_shared_memory(chat_id: int, speaker: str, text: str):
+    """Record a persona's group reply so sister personas see it"""
+    shared_group_memory[chat_id].append({
+        'speaker': speaker,
+        'content': text,
+        'timestamp': datetime.now(timezone.utc).isoformat()
+    })
+
+
+def get_shared_context(chat_id: int, persona_name: str) -> List[Dict]:
+    """Shared group replies as chat turns from this persona's point of view"""
+    turns = []
+    for item in shared_group_memory.get(chat_id, []):
+        if item['speaker'] == persona_name:
+            turns.append({'role': 'assistant', 'content': item['content']})
+        else:
+            turns.append({'role': 'user', 'content': f"{item['speaker']}: {item['content']}"})
+    return turns
+
 
 async def delete_later(bot, chat_id, message_id, delay=120):
     """Message ko 2 minute baad delete karne wala function"""
@@ -1787,34 +4008,80 @@ async def send_multi_messages(
         except Exception as e:
             logger.error(f"Send error: {e}")
 
+async def send_voice_reply(
+    bot,
+    chat_id: int,
+    text: str,
+    mood: str = 'neutral',
+    voice: Optional[str] = None,
+    audio: Optional[BytesIO] = None,
+    rate: Optional[str] = None,
+    pitch: Optional[str] = None,
+    **send_kwargs
+) -> bool:
+    """Send a voice note, re-using Telegram's file_id for repeated clips
+    (audio = clip already synthesized by the caller)"""
+    if not text or len(text.strip()) < 5:
+        return False
+    
+    key = voice_generator.key_for(text, mood, voice=voice, rate=rate, pitch=pitch)
+    file_id = telegram_file_ids.get(bot.id, key)
+    if file_id:
+        try:
+            await bot.send_voice(chat_id=chat_id, voice=file_id, **send_kwargs)
+            return True
+        except BadRequest:
+            telegram_file_ids.drop(bot.id, key)  # Expired/foreign id - upload again
+    
+    if audio is None:
+        audio = await voice_generator.generate(text, mood=mood, voice=voice, rate=rate, pitch=pitch)
+    if not audio:
+        return False
+    
+    sent = await bot.send_voice(chat_id=chat_id, voice=audio, **send_kwargs)
+    if sent and sent.voice:
+        telegram_file_ids.put(bot.id, key, sent.voice.file_id)
+    return True
+
+async def prepare_voice_reply(bot_id: int, user_id: int, text: str, mood: str,
+                              voice: Optional[str] = None) -> Tuple[Optional[str], Optional[BytesIO]]:
+    """Preference check + synthesis for a reply, run while its text is sent
+    
+    Returns (None, None) if no voice note should go out, and (text, None)
+    if Telegram already has this clip (send_voice_reply re-uses its file_id).
+    """
+    prefs = await db.get_user_preferences(user_id)
+    if not voice_generator.should_send_voice(text, prefs.get('voice_enabled', False), is_group=False):
+        return None, None
+    if telegram_file_ids.get(bot_id, voice_generator.key_for(text, mood, voice=voice)):
+        return text, None
+    audio = await voice_generator.generate(text, mood=mood, voice=voice)
+    return (text, audio) if audio else (None, None)
+
+async def send_chat_action_quietly(bot, chat_id, action):
+    """Fire-and-forget chat action (indicator only, never blocks a reply)"""
+    try:
+        await bot.send_chat_action(chat_id=chat_id, action=action)
+    except Exception as e:
+        logger.debug(f"Chat action error: {e}")
+
 async def send_kavya_voice(bot, chat_id, text):
     """
     Kavya ki awaaz (Calm & Composed).
     Uses Edge-TTS with slower rate, lower pitch.
     """
     try:
-        # Voice: Neerja (Indian English) - good for Hinglish
-        voice = 'en-IN-NeerjaNeural'
-        rate = '-8%'   # Slower pace
-        pitch = '-3Hz' # Slightly lower pitch
-        
-        output_file = f"voice_{chat_id}_{int(datetime.now().timestamp())}.mp3"
-        
-        communicate = edge_tts.Communicate(text, voice, rate=rate, pitch=pitch)
-        await communicate.save(output_file)
+        asyncio.create_task(send_chat_action_quietly(bot, chat_id, ChatAction.RECORD_VOICE))
         
-        await bot.send_chat_action(chat_id=chat_id, action=ChatAction.RECORD_VOICE)
-        await asyncio.sleep(len(text) / 12)  # Slightly slower
-        
-        with open(output_file, 'rb') as audio:
-            await bot.send_voice(
-                chat_id=chat_id, 
-                voice=audio,
-                # caption optional
-            )
-            
-        if os.path.exists(output_file):
-            os.remove(output_file)
+        # Voice: Neerja (Indian English) - good for Hinglish
+        sent = await send_voice_reply(
+            bot, chat_id, text,
+            voice='en-IN-NeerjaNeural',
+            rate='-8%',   # Slower pace
+            pitch='-3Hz'  # Slightly lower pitch
+        )
+        if not sent:
+            await bot.send_message(chat_id=chat_id, text=text)
             
     except Exception as e:
         logger.error(f"Voice Error: {e}")
@@ -1882,6 +4149,381 @@ def is_user_talking_to_others(message: Message, bot_username: str, bot_id: int)
     
     return False
 
+# ============================================================================
+# 📢 BROADCAST ENGINE (flood-controlled fan-out)
+# ============================================================================
+
+class TokenBucket:
+    """Async token bucket; pause() holds every sender on this bucket after a flood wait"""
+    
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+    
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, monotonic() + seconds)
+    
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class BroadcastJob:
+    """Persisted broadcast: target list, cursor, per-target results, counters
+    
+    Results are only kept for targets past the cursor; everything before it
+    is final and summed up in the report, so checkpoints stay small.
+    """
+    
+    FINAL = ('sent', 'forbidden', 'failed')
+    
+    def __init__(self, job_id: str, persona: str, message: Dict, targets: List[int],
+                 status_chat_id: int = None, status_message_id: int = None):
+        self.job_id = job_id
+        self.persona = persona
+        self.message = message  # {'text': ...} or {'from_chat_id': ..., 'message_id': ...}
+        self.targets = targets
+        self.results: Dict[int, str] = {}
+        self.cursor = 0  # targets[:cursor] all have a final result
+        self.state = 'running'  # running / paused / done
+        self.report = {
+            'total': len(targets), 'sent': 0, 'forbidden': 0, 'failed': 0,
+            'retried': 0, 'flood_waits': 0, 'elapsed': 0.0
+        }
+        self.status_chat_id = status_chat_id
+        self.status_message_id = status_message_id
+        self.created_at = datetime.now(timezone.utc).isoformat()
+        self.dirty = True
+        self.saved = False  # Full row (with targets) written once, then progress only
+    
+    @classmethod
+    def create(cls, persona: str, message: Dict, targets: List[int], **kwargs) -> 'BroadcastJob':
+        job_id = f"{datetime.now(timezone.utc).strftime('%y%m%d%H%M%S')}-{os.urandom(2).hex()}"
+        return cls(job_id, persona, message, list(dict.fromkeys(targets)), **kwargs)
+    
+    def record(self, chat_id: int, result: str):
+        self.results[chat_id] = result
+        self.report[result] += 1
+        while self.cursor < len(self.targets) and self.targets[self.cursor] in self.results:
+            del self.results[self.targets[self.cursor]]  # Now covered by cursor + report
+            self.cursor += 1
+        self.dirty = True
+    
+    def pending(self) -> List[int]:
+        """Targets still without a final result (resume point onwards)"""
+        return [c for c in self.targets[self.cursor:] if c not in self.results]
+    
+    @property
+    def done_count(self) -> int:
+        return sum(self.report[k] for k in self.FINAL)
+    
+    @property
+    def scope(self) -> Optional[str]:
+        """Persona.scope of the sending bot (None = primary, incl. scheduled fan-outs)"""
+        return next((p.scope for p in PERSONAS if p.name == self.persona), None)
+    
+    def progress_row(self) -> Dict:
+        """Per-tick checkpoint: state, cursor, counters and the results past the cursor"""
+        return {
+            'state': self.state,
+            'results': {str(k): v for k, v in self.results.items()},
+            'cursor': self.cursor,
+            'report': self.report,
+            'updated_at': datetime.now(timezone.utc).isoformat()
+        }
+    
+    def to_row(self) -> Dict:
+        return {
+            'job_id': self.job_id,
+            'persona': self.persona,
+            'message': self.message,
+            'targets': self.targets,
+            'status_chat_id': self.status_chat_id,
+            'status_message_id': self.status_message_id,
+            'created_at': self.created_at,
+            **self.progress_row()
+        }
+    
+    @classmethod
+    def from_row(cls, row: Dict) -> 'BroadcastJob':
+        job = cls(
+            row['job_id'], row.get('persona') or '', row.get('message') or {},
+            [int(c) for c in row.get('targets') or []],
+            row.get('status_chat_id'), row.get('status_message_id')
+        )
+        job.cursor = int(row.get('cursor') or 0)
+        tail = set(job.targets[job.cursor:])
+        job.results = {int(k): v for k, v in (row.get('results') or {}).items() if int(k) in tail}
+        job.state = row.get('state') or 'paused'
+        job.report.update(row.get('report') or {})
+        job.created_at = row.get('created_at') or job.created_at
+        job.dirty = False
+        job.saved = True
+        return job
+
+
+class BroadcastEngine:
+    """Concurrent sender pool behind per-bot global + group buckets and a per-chat gap
+    
+    Telegram's flood limits are per bot token, so every bot (persona) gets
+    its own buckets and a RetryAfter only pauses the bot that received it.
+    """
+    
+    # Failures raised before the request went out - nothing can have been delivered
+    UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+    
+    def __init__(self):
+        self.buckets: Dict[int, Tuple[TokenBucket, TokenBucket]] = {}  # bot_id -> (global, group)
+        self._next_send: Dict[Tuple[int, int], float] = {}  # (bot_id, chat_id) -> earliest next send (monotonic)
+        self.jobs: Dict[str, BroadcastJob] = {}  # Loaded/running jobs by id
+        self.bots: Dict[str, Any] = {}  # Persona.name -> that persona's bot (set in build_persona_app)
+        self._running: Dict[str, asyncio.Task] = {}
+    
+    def _buckets(self, bot_id: int) -> Tuple[TokenBucket, TokenBucket]:
+        if bot_id not in self.buckets:
+            self.buckets[bot_id] = (
+                TokenBucket(Config.BROADCAST_GLOBAL_RATE),
+                TokenBucket(Config.BROADCAST_GROUP_RATE)
+            )
+        return self.buckets[bot_id]
+    
+    async def _pace(self, bot_id: int, chat_id: int):
+        wait = self._next_send.get((bot_id, chat_id), 0.0) - monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        global_bucket, group_bucket = self._buckets(bot_id)
+        await global_bucket.acquire()
+        if chat_id < 0:
+            await group_bucket.acquire()
+        self._next_send[(bot_id, chat_id)] = monotonic() + Config.BROADCAST_PER_CHAT_INTERVAL
+    
+    async def checkpoint(self, job: BroadcastJob, force: bool = False):
+        if not job.job_id:
+            return  # Transient fan-out, nothing to resume
+        if job.dirty or force:
+            job.dirty = False
+            if job.saved:
+                await db.update_broadcast_job(job.job_id, job.progress_row())
+            else:
+                await db.save_broadcast_job(job.to_row())
+                job.saved = True
+    
+    async def run(self, job: BroadcastJob, send, bot_id: int, on_progress=None) -> Dict[str, Any]:
+        """Deliver send(chat_id) from bot_id to every pending target; stops early if the job is paused"""
+        report = job.report
+        started = monotonic() - report['elapsed']
+        queue: asyncio.Queue = asyncio.Queue()
+        for chat_id in job.pending():
+            queue.put_nowait((chat_id, 0))
+        
+        async def worker():
+            while True:
+                chat_id, attempt = await queue.get()
+                try:
+                    if job.state != 'running':
+                        continue  # Paused - leave the target pending
+                    if db.is_unreachable(chat_id, job.scope):
+                        job.record(chat_id, 'forbidden')  # Marked dead since the job started
+                        continue
+                    await self._pace(bot_id, chat_id)
+                    await send(chat_id)
+                    job.record(chat_id, 'sent')
+                except RetryAfter as e:
+                    # Flood wait applies to this whole bot - hold its senders only
+                    report['flood_waits'] += 1
+                    self._buckets(bot_id)[0].pause(e.retry_after)
+                    self._requeue(queue, job, bot_id, chat_id, attempt, e.retry_after)
+                except Forbidden:
+                    job.record(chat_id, 'forbidden')  # Blocked / kicked
+                    await db.mark_chat_unreachable(chat_id, job.scope)
+                except BadRequest as e:
+                    job.record(chat_id, 'failed')  # Chat not found etc. - retrying won't help
+                    logger.debug(f"Broadcast bad request for {chat_id}: {e}")
+                except (TimedOut, NetworkError) as e:
+                    if isinstance(e.__cause__, self.UNSENT_ERRORS):
+                        self._requeue(queue, job, bot_id, chat_id, attempt, 1.0)
+                    else:
+                        # May already have been delivered - a retry could send it twice
+                        job.record(chat_id, 'failed')
+                        logger.debug(f"Broadcast delivery unknown for {chat_id}: {e}")
+                except Exception as e:
+                    job.record(chat_id, 'failed')
+                    logger.error(f"Broadcast error for {chat_id}: {e}")
+                finally:
+                    queue.task_done()
+        
+        async def ticker():
+            while True:
+                await asyncio.sleep(Config.BROADCAST_PROGRESS_INTERVAL)
+                report['elapsed'] = round(monotonic() - started, 1)
+                await self.checkpoint(job)
+                if on_progress:
+                    try:
+                        await on_progress(job)
+                    except Exception as e:
+                        logger.debug(f"Broadcast progress error: {e}")
+        
+        workers = [asyncio.create_task(worker()) for _ in range(max(1, Config.BROADCAST_CONCURRENCY))]
+        progress = asyncio.create_task(ticker())
+        try:
+            await queue.join()
+        finally:
+            for task in workers + [progress]:
+                task.cancel()
+            now = monotonic()
+            self._next_send = {c: t for c, t in self._next_send.items() if t > now}
+            report['elapsed'] = round(monotonic() - started, 1)
+        
+        if job.state == 'running' and not job.pending():
+            job.state = 'done'
+        await self.checkpoint(job, force=True)
+        if job.job_id:
+            logger.info(f"📢 Broadcast {job.job_id} {job.state}: {report}")
+        return report
+    
+    async def fan_out(self, bot_id: int, targets: List[int], send) -> Dict[str, Any]:
+        """Paced concurrent delivery for scheduled jobs (no checkpoints)"""
+        job = BroadcastJob('', '', {}, list(dict.fromkeys(targets)))
+        return await self.run(job, send, bot_id)
+    
+    def _requeue(self, queue: asyncio.Queue, job: BroadcastJob, bot_id: int,
+                 chat_id: int, attempt: int, delay: float):
+        """Retry later (within BROADCAST_RETRY_ATTEMPTS) or count as failed"""
+        if attempt + 1 >= Config.BROADCAST_RETRY_ATTEMPTS:
+            job.record(chat_id, 'failed')
+            return
+        job.report['retried'] += 1
+        self._next_send[(bot_id, chat_id)] = monotonic() + delay
+        queue.put_nowait((chat_id, attempt + 1))
+    
+    # ---------- job control ----------
+    
+    @staticmethod
+    def _sender(bot, job: BroadcastJob):
+        message = job.message
+        
+        async def send(chat_id: int):
+            if message.get('message_id'):
+                await bot.copy_message(
+                    chat_id=chat_id,
+                    from_chat_id=message['from_chat_id'],
+                    message_id=message['message_id']
+                )
+            else:
+                await bot.send_message(
+                    chat_id=chat_id,
+                    text=message['text'],
+                    parse_mode=ParseMode.HTML
+                )
+        return send
+    
+    @staticmethod
+    def progress_text(job: BroadcastJob) -> str:
+        r = job.report
+        return (
+            f"📢 Broadcasting... (<code>{job.job_id}</code>)\n"
+            f"🔄 Progress: {job.done_count}/{r['total']}\n"
+            f"✅ Success: {r['sent']}\n"
+            f"❌ Failed: {r['forbidden'] + r['failed']}"
+        )
+    
+    @staticmethod
+    def report_text(job: BroadcastJob) -> str:
+        r = job.report
+        rate = r['sent'] / r['elapsed'] if r['elapsed'] else r['sent']
+        title = "✅ <b>Broadcast Complete!</b>" if job.state == 'done' else f"⏸ <b>Broadcast {job.state}</b>"
+        return (
+            f"{title} (<code>{job.job_id}</code>)\n\n"
+            f"👥 Total Targets: {r['total']}\n"
+            f"🔄 Done: {job.done_count}/{r['total']}\n\n"
+            f"✅ Success: {r['sent']}\n"
+            f"🚫 Blocked/Kicked: {r['forbidden']}\n"
+            f"❌ Failed: {r['failed']}\n"
+            f"🔁 Retries: {r['retried']} (flood waits: {r['flood_waits']})\n"
+            f"⏱ Time: {r['elapsed']}s ({rate:.1f} msg/s)"
+        )
+    
+    def start(self, bot, job: BroadcastJob):
+        """Run (or resume) a job in the background with this persona's bot"""
+        job.state = 'running'
+        job.dirty = True
+        self.jobs[job.job_id] = job
+        if job.job_id in self._running:
+            return  # Still draining after a pause - the runner picks it up again
+        
+        async def edit_status(text: str):
+            if job.status_chat_id and job.status_message_id:
+                await bot.edit_message_text(
+                    text, chat_id=job.status_chat_id,
+                    message_id=job.status_message_id, parse_mode=ParseMode.HTML
+                )
+        
+        async def on_progress(j: BroadcastJob):
+            await edit_status(self.progress_text(j))
+        
+        async def runner():
+            try:
+                while True:
+                    await self.run(job, self._sender(bot, job), bot.id, on_progress=on_progress)
+                    if job.state != 'running' or not job.pending():
+                        break
+                await edit_status(self.report_text(job))
+            except Exception as e:
+                logger.debug(f"Broadcast report edit error: {e}")
+            finally:
+                self._running.pop(job.job_id, None)
+        
+        # Plain task: Application.stop() must not wait hours for a broadcast
+        self._running[job.job_id] = asyncio.create_task(runner())
+    
+    def pause(self, job_id: str) -> Optional[BroadcastJob]:
+        """Stop sending after in-flight messages; progress is kept"""
+        job = self.jobs.get(job_id)
+        if job and job.state == 'running':
+            job.state = 'paused'
+            job.dirty = True
+        return job
+    
+    async def load(self, job_id: str = None) -> List[BroadcastJob]:
+        """Recent jobs (memory first, then the DB checkpoint)"""
+        rows = await db.get_broadcast_jobs()
+        jobs = []
+        for row in rows:
+            if job_id and row.get('job_id') != job_id:
+                continue
+            job = self.jobs.get(row['job_id']) or BroadcastJob.from_row(row)
+            jobs.append(job)
+        for job in self.jobs.values():
+            if job not in jobs and (not job_id or job.job_id == job_id):
+                jobs.append(job)
+        return jobs
+    
+    async def shutdown(self):
+        """Stop senders and checkpoint; 'running' jobs resume on next start"""
+        tasks = list(self._running.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for job in list(self.jobs.values()):
+            await self.checkpoint(job, force=True)
+
+
+broadcast_engine = BroadcastEngine()
+
 # ============================================================================
 # COMMAND HANDLERS (Adjusted texts)
 # ============================================================================
@@ -1911,17 +4553,15 @@ async def voice_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await db.update_preference(user.id, 'voice', value)
     
     if value:
-        audio = await voice_generator.generate(
+        sent = await send_voice_reply(
+            context.bot,
+            update.effective_chat.id,
             "Voice mode enabled. I'll occasionally reply with voice notes.",
-            mood='composed'
+            mood='composed',
+            voice=get_persona(context).voice,
+            caption="🎤 Voice Mode: ON ✅"
         )
-        if audio:
-            await context.bot.send_voice(
-                chat_id=update.effective_chat.id,
-                voice=audio,
-                caption="🎤 Voice Mode: ON ✅"
-            )
-        else:
+        if not sent:
             await update.message.reply_text("🎤 Voice Mode: ON ✅")
     else:
         await update.message.reply_text("🎤 Voice Mode: OFF ❌\nOnly text replies now.")
@@ -1945,24 +4585,30 @@ async def say_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
     
-    if len(text) > 500:
-        text = text[:500] + "..."
+    if len(text) > Config.SAY_MAX_TEXT_LENGTH:
+        text = text[:Config.SAY_MAX_TEXT_LENGTH] + "..."
     
-    await context.bot.send_chat_action(
-        chat_id=update.effective_chat.id, 
-        action=ChatAction.RECORD_VOICE
-    )
+    if not rate_limiter.check_say(user.id):
+        await update.message.reply_text(
+            f"🎤 Thoda ruko - ek minute mein {Config.SAY_MAX_PER_MINUTE} voice notes hi ban sakte hain."
+        )
+        return
+    
+    asyncio.create_task(send_chat_action_quietly(
+        context.bot, update.effective_chat.id, ChatAction.RECORD_VOICE
+    ))
     
     mood = Mood.get_random_mood()
-    audio = await voice_generator.generate(text, mood=mood)
+    sent = await send_voice_reply(
+        context.bot,
+        update.effective_chat.id,
+        text,
+        mood=mood,
+        voice=get_persona(context).voice,
+        reply_to_message_id=update.message.message_id
+    )
     
-    if audio:
-        await context.bot.send_voice(
-            chat_id=update.effective_chat.id,
-            voice=audio,
-            reply_to_message_id=update.message.message_id
-        )
-    else:
+    if not sent:
         await update.message.reply_text("🎤 Voice generate nahi ho payi. Kripya punah prayas karein.")
 
 
@@ -1971,32 +4617,102 @@ async def voices_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not await admin_check(update):
         return
     
-    voices = await voice_generator.list_available_voices()
+    locale = context.args[0] if context.args else 'hi-IN'
+    voices = await voice_generator.list_available_voices(locale)
     
     if voices:
         voice_list = "\n".join([f"• {v['ShortName']} - {v['Gender']}" for v in voices[:10]])
         await update.message.reply_text(
-            f"🎤 <b>Available Hindi Voices:</b>\n\n{voice_list}",
+            f"🎤 <b>Available {html.escape(locale)} Voices:</b>\n\n{voice_list}",
             parse_mode=ParseMode.HTML
         )
     else:
         await update.message.reply_text("Voice list fetch nahi ho payi.")
 
+def persona_about_text(persona: Persona) -> str:
+    """/about text for a secondary persona, built from its character card"""
+    card = character_cards.get(persona.card_path)
+    description = card.description.replace('{{char}}', persona.name).split('\n\n')[0]
+    if len(description) > 600:
+        description = description[:600].rsplit(' ', 1)[0] + '…'
+    return (
+        f"\n🌸 <b>About {html.escape(persona.name)}</b> 🌸\n\n"
+        f"{html.escape(description)}\n\n"
+        f"<b>Personality:</b> {html.escape(card.personality)}\n"
+    )
+
+
+def persona_help_text(persona: Persona, short: bool = False) -> str:
+    """/help text - diary and check-ins are only run by the primary persona"""
+    name = html.escape(persona.name)
+    if short:
+        diary_command = "• /diary on/off - Secret diary\n" if persona.primary else ""
+        return f"""
+✨ <b>{name} se kaise baat karein:</b>
+
+• /start - Start fresh
+• /help - Help menu
+• /mood - Aaj ka mood
+• /forget - Memory clear
+• /voice on/off - 🎤 Voice toggle
+• /say [text] - Text to voice
+{diary_command}
+Seedhe message bhejo, main reply karungi! 💫
+Group mein @mention karo ya reply do.
+"""
+    
+    primary_commands = """• /diary on/off - Diary toggle
+• /checkin on/off - Morning/night messages toggle
+""" if persona.primary else ""
+    diary_section = """<b>Secret Diary 💖:</b>
+• Har raat 10 baje locked card aayegi
+• Unlock karke padhna meri diary entry
+
+""" if persona.primary else ""
+    
+    return f"""
+✨ <b>{name} se baat kaise karein:</b>
+
+<b>Commands:</b>
+• /start - Start fresh
+• /help - Yeh menu
+• /about - Mere baare mein
+• /mood - Aaj ka mood
+• /forget - Memory clear karo
+• /meme on/off - Memes toggle
+• /shayari on/off - Shayari toggle
+{primary_commands}• /voice on/off - 🎤 Voice replies toggle
+• /say [text] - 🎤 Text ko voice mein bolo
+• /stats - Your stats
+
+<b>🎤 Voice Feature:</b>
+• /voice on karke voice replies enable karo
+• Main kabhi kabhi voice mein bhi reply karungi
+• /say se koi bhi text voice mein sunao
+
+{diary_section}<b>Tips:</b>
+• Seedhe message bhejo, main reply karungi
+• Group mein @mention karo ya reply do
+
+Made with 💕 by {name}
+"""
+
+
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /start with Image and Buttons"""
     user = update.effective_user
     chat = update.effective_chat
     is_private = chat.type == 'private'
+    persona = get_persona(context)
     
     if is_private:
-        await db.get_or_create_user(user.id, user.first_name, user.username)
+        user_row = await db.get_or_create_user(user.id, user.first_name, user.username)
+        if db.is_unreachable(user.id, persona.scope, row=user_row):
+            await db.mark_chat_reachable(user.id, persona.scope)  # Unblocked and restarted us
         health_server.stats['users'] = await db.get_user_count()
     else:
-        await db.get_or_create_group(chat.id, chat.title)
+        await db.get_or_create_group(chat.id, chat.title, persona=persona.scope)
 
-    # Choose a more elegant image (maybe a journal or something)
-    image_url = "https://images.unsplash.com/photo-1532012197267-da84d127e765?w=800&q=80"  # Books & pen
-    
     keyboard = [
         [
             InlineKeyboardButton("✨ Add to Group", url=f"https://t.me/{context.bot.username}?startgroup=true"),
@@ -2010,18 +4726,25 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     reply_markup = InlineKeyboardMarkup(keyboard)
 
     greeting = TimeAware.get_greeting()
-    caption_text = (
-        f"{greeting} {user.first_name} ji! 👋\n\n"
-        f"Main <b>Kavya</b> hoon, Delhi se. 📝\n"
-        f"Aap se baat karke achha lagega.\n\n"
-        f"Aaj kya soch rahe hain? Ya koi baat karni hai? 🌸\n\n"
-        f"<i>💡 Tip: Raat ko 10 baje secret diary aati hai!</i>"
-    )
+    if persona.primary:
+        caption_text = (
+            f"{greeting} {user.first_name} ji! 👋\n\n"
+            f"Main <b>Kavya</b> hoon, Delhi se. 📝\n"
+            f"Aap se baat karke achha lagega.\n\n"
+            f"Aaj kya soch rahe hain? Ya koi baat karni hai? 🌸\n\n"
+            f"<i>💡 Tip: Raat ko 10 baje secret diary aati hai!</i>"
+        )
+    else:
+        caption_text = (
+            f"{greeting} {user.first_name} ji! 👋\n\n"
+            f"Main <b>{html.escape(persona.name)}</b> hoon.\n"
+            f"Aap se baat karke achha lagega.\n\n"
+            f"Aaj kya soch rahe hain? Ya koi baat karni hai? 🌸"
+        )
 
     try:
-        await context.bot.send_photo(
-            chat_id=chat.id,
-            photo=image_url,
+        await media_registry.send_photo(
+            context.bot, 'start', chat.id,
             caption=caption_text,
             reply_markup=reply_markup,
             parse_mode=ParseMode.HTML
@@ -2040,41 +4763,15 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /help"""
-    help_text = """
-✨ <b>Kavya se baat kaise karein:</b>
-
-<b>Commands:</b>
-• /start - Start fresh
-• /help - Yeh menu
-• /about - Mere baare mein
-• /mood - Aaj ka mood
-• /forget - Memory clear karo
-• /meme on/off - Memes toggle
-• /shayari on/off - Shayari toggle
-• /diary on/off - Diary toggle
-• /voice on/off - 🎤 Voice replies toggle
-• /say [text] - 🎤 Text ko voice mein bolo
-• /stats - Your stats
-
-<b>🎤 Voice Feature:</b>
-• /voice on karke voice replies enable karo
-• Main kabhi kabhi voice mein bhi reply karungi
-• /say se koi bhi text voice mein sunao
-
-<b>Secret Diary 💖:</b>
-• Har raat 10 baje locked card aayegi
-• Unlock karke padhna meri diary entry
-
-<b>Tips:</b>
-• Seedhe message bhejo, main reply karungi
-• Group mein @mention karo ya reply do
-
-Made with 💕 by Kavya
-"""
-    await update.message.reply_html(help_text)
+    await update.message.reply_html(persona_help_text(get_persona(context)))
 
 async def about_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /about"""
+    persona = get_persona(context)
+    if not persona.primary:
+        await update.message.reply_html(persona_about_text(persona))
+        return
+    
     about_text = """
 🌸 <b>About Kavya</b> 🌸
 
@@ -2118,7 +4815,7 @@ async def mood_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def forget_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /forget"""
     user = update.effective_user
-    await db.clear_user_memory(user.id)
+    await db.clear_user_memory(user.id, persona=get_persona(context).scope)
     
     messages = ["Kshama karein, main sab bhool gayi. 🧹", "Nayi shuruaat karte hain? ✨"]
     await send_multi_messages(context.bot, update.effective_chat.id, messages)
@@ -2156,6 +4853,22 @@ async def shayari_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(f"Shayari: {status}")
 
 
+async def checkin_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Toggle routine check-in messages"""
+    user = update.effective_user
+    args = context.args
+    
+    if not args or args[0].lower() not in ['on', 'off']:
+        await update.message.reply_text("Use: /checkin on ya /checkin off")
+        return
+    
+    value = args[0].lower() == 'on'
+    await db.update_preference(user.id, 'routine', value)
+    
+    status = "ON ✅" if value else "OFF ❌"
+    await update.message.reply_text(f"Good morning / night messages: {status}")
+
+
 async def diary_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Toggle diary preference"""
     user = update.effective_user
@@ -2456,7 +5169,7 @@ async def users_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("Only admins can do this!")
         return
     
-    users = await db.get_all_users()
+    users = await db.get_all_users(reachable_only=False)
     
     user_lines = []
     for u in users[:20]:
@@ -2503,8 +5216,9 @@ async def broadcast_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     status_msg = await update.message.reply_text("📢 fetching database... wait")
 
     # Users aur Groups dono ko fetch karna
-    users = await db.get_all_users()
-    groups = await db.get_all_groups()
+    scope = get_persona(context).scope
+    users = await db.get_all_users(persona=scope)
+    groups = await db.get_all_groups(persona=scope)
 
     # Targets List banana (User IDs + Group Chat IDs)
     targets = []
@@ -2519,67 +5233,117 @@ async def broadcast_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         gid = group.get('chat_id')
         if gid: targets.append(gid)
 
-    # Stats setup
-    success = 0
-    failed = 0
-    total = len(targets)
-    
-    if total == 0:
+    if not targets:
         await status_msg.edit_text("❌ Database empty hai! Koi users ya groups nahi mile.")
         return
 
-    await status_msg.edit_text(f"📢 Starting Broadcast to {len(users)} Users & {len(groups)} Groups...")
-
     # Message Content Setup
-    final_text = html.escape(message_text) if message_text else None
-
-    # Combined Loop for Users & Groups
-    for i, chat_id in enumerate(targets):
-        try:
-            if reply_msg:
-                await context.bot.copy_message(
-                    chat_id=chat_id,
-                    from_chat_id=update.effective_chat.id,
-                    message_id=reply_msg.message_id
-                )
-            else:
-                await context.bot.send_message(
-                    chat_id=chat_id,
-                    text=final_text,
-                    parse_mode=ParseMode.HTML
-                )
-            success += 1
-        except Forbidden:
-            failed += 1 # User blocked bot or kicked from group
-        except RetryAfter as e:
-            logger.warning(f"FloodWait: Sleeping {e.retry_after}s")
-            await asyncio.sleep(e.retry_after)
-            failed += 1 
-        except Exception as e:
-            failed += 1
-            logger.error(f"Broadcast error for {chat_id}: {e}")
+    if reply_msg:
+        message = {'from_chat_id': update.effective_chat.id, 'message_id': reply_msg.message_id}
+    else:
+        message = {'text': html.escape(message_text)}
 
-        # Status Update
-        if i % 20 == 0:
-            try:
-                await status_msg.edit_text(
-                    f"📢 Broadcasting...\n"
-                    f"🔄 Progress: {i}/{total}\n"
-                    f"✅ Success: {success}\n"
-                    f"❌ Failed: {failed}"
-                )
-            except: pass
-        
-        await asyncio.sleep(0.05) # Small delay
+    job = BroadcastJob.create(
+        get_persona(context).name, message, targets,
+        status_chat_id=status_msg.chat_id, status_message_id=status_msg.message_id
+    )
+    await broadcast_engine.checkpoint(job)
 
-    # Final Report
     await status_msg.edit_text(
-        f"✅ <b>Broadcast Complete!</b>\n\n"
-        f"👥 Total Targets: {total}\n"
-        f"👤 Users: {len(users)}\n"
-        f"🛡Groups: {len(groups)}\n\n"
-        f"✅ Success: {success}\n"
-        f"❌ Failed/Blocked: {failed}"
+        f"📢 Starting Broadcast <code>{job.job_id}</code> to {len(users)} Users & {len(groups)} Groups...\n"
+        f"/bcpause {job.job_id} • /bcstatus {job.job_id}",
+        parse_mode=ParseMode.HTML
+    )
+
+    # Runs in the background so the bot keeps answering while it fans out
+    broadcast_engine.start(context.bot, job)
+
+
+async def bcstatus_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show recent broadcast jobs or one job (admin only)"""
+    if not await admin_check(update):
+        return
+    
+    job_id = context.args[0] if context.args else None
+    jobs = await broadcast_engine.load(job_id)
+    if not jobs:
+        await update.message.reply_text("📢 Koi broadcast job nahi mila.")
+        return
+    
+    if job_id:
+        await update.message.reply_html(broadcast_engine.report_text(jobs[0]))
+        return
+    
+    lines = [
+        f"• <code>{j.job_id}</code> {j.state} - {j.done_count}/{j.report['total']} "
+        f"(✅ {j.report['sent']})"
+        for j in jobs[:10]
+    ]
+    await update.message.reply_html("📢 <b>Broadcast Jobs:</b>\n\n" + "\n".join(lines))
+
+
+async def bcpause_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Pause a running broadcast - /bcpause ID (admin only)"""
+    if not await admin_check(update):
+        return
+    
+    if not context.args:
+        await update.message.reply_html("Usage: <code>/bcpause ID</code>")
+        return
+    
+    job = broadcast_engine.pause(context.args[0])
+    if not job or job.state != 'paused':
+        await update.message.reply_text("❌ Running broadcast nahi mila.")
+        return
+    await broadcast_engine.checkpoint(job, force=True)
+    await update.message.reply_html(
+        f"⏸ Broadcast <code>{job.job_id}</code> paused at {job.done_count}/{job.report['total']}.\n"
+        f"Resume: <code>/bcresume {job.job_id}</code>"
+    )
+
+
+async def bcresume_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Resume a paused broadcast from its checkpoint - /bcresume ID (admin only)"""
+    if not await admin_check(update):
+        return
+    
+    if not context.args:
+        await update.message.reply_html("Usage: <code>/bcresume ID</code>")
+        return
+    
+    jobs = await broadcast_engine.load(context.args[0])
+    if not jobs or jobs[0].state == 'done':
+        await update.message.reply_text("❌ Resume karne layak broadcast nahi mila.")
+        return
+    
+    job = jobs[0]
+    bot = broadcast_engine.bots.get(job.persona)
+    if bot is None:
+        # Targets were picked for that persona's bot - never send them from another one
+        await update.message.reply_html(
+            f"❌ Broadcast <code>{job.job_id}</code> ka bot ({html.escape(job.persona)}) yahan nahi chal raha."
+        )
+        return
+    broadcast_engine.start(bot, job)
+    await update.message.reply_html(
+        f"▶️ Broadcast <code>{job.job_id}</code> resumed from {html.escape(job.persona)} "
+        f"({len(job.pending())} pending)."
+    )
+
+
+async def reloadlore_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Reload world info from DB right now (admin only)"""
+    if not await admin_check(update):
+        await update.message.reply_text("Only admins can do this!")
+        return
+    
+    changed = await db.refresh_world_info()
+    status = db.world_info_status()
+    await update.message.reply_html(
+        f"🌍 <b>World Info</b> {'reloaded ✅' if changed else 'unchanged'}\n\n"
+        f"• Entries: {status['entries']}\n"
+        f"• Revision: {status['revision']}\n"
+        f"• Version: <code>{status['version']}</code>"
     )
 
 
@@ -2595,6 +5359,10 @@ async def adminhelp_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 • /adminstats - Bot statistics
 • /users - User list
 • /broadcast [PIN] [message] - Broadcast
+• /bcstatus [ID] - Broadcast jobs / progress
+• /bcpause [ID] - Pause a broadcast
+• /bcresume [ID] - Resume from checkpoint
+• /reloadlore - Reload world info now
 • /adminhelp - This menu
 """
     await update.message.reply_html(help_text)
@@ -2626,16 +5394,38 @@ async def send_daily_geeta(context: ContextTypes.DEFAULT_TYPE):
             await context.bot.send_message(chat_id=chat_id, text=quote, parse_mode=ParseMode.HTML)
             sent += 1
             await asyncio.sleep(0.1)
+        except Forbidden:
+            await db.mark_chat_unreachable(chat_id)
         except:
             pass
     
     logger.info(f"📿 Daily Geeta sent to {sent} groups")
 
 
+async def content_pool_job(context: ContextTypes.DEFAULT_TYPE):
+    """Refill pre-generated content pools during idle periods"""
+    await content_pool.refill(kavya_ai)
+
+
+async def world_info_refresh_job(context: ContextTypes.DEFAULT_TYPE):
+    """Pick up lorebook changes from the world_info table without a restart"""
+    await db.refresh_world_info()
+
+
+async def broadcast_resume_job(context: ContextTypes.DEFAULT_TYPE):
+    """Continue broadcasts that were running when the process last stopped"""
+    persona = get_persona(context)
+    for job in await broadcast_engine.load():
+        if job.state == 'running' and job.persona == persona.name:
+            logger.info(f"📢 Resuming broadcast {job.job_id} ({len(job.pending())} pending)")
+            broadcast_engine.start(context.bot, job)
+
+
 async def cleanup_job(context: ContextTypes.DEFAULT_TYPE):
     """Periodic cleanup"""
     rate_limiter.cleanup_cooldowns()
     await db.cleanup_local_cache()
+    telegram_file_ids.save()
     logger.info("🧹 Cleanup completed")
 
 
@@ -2653,8 +5443,10 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat = update.effective_chat
     user_message = message.text
     
-    # Update activity
-    await db.update_user_activity(user.id)
+    # Update activity (a DM also makes the user reachable again for this bot)
+    await db.update_user_activity(
+        user.id, private=update.effective_chat.type == 'private', persona=get_persona(context).scope
+    )
     
     # Ignore commands
     if user_message.startswith('/'):
@@ -2662,26 +5454,24 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     is_group = chat.type in ['group', 'supergroup']
     is_private = chat.type == 'private'
-    bot_username = Config.BOT_USERNAME
+    persona = get_persona(context)
+    ai = get_ai(context)
+    bot_username = persona.username or context.bot.username
     bot_id = context.bot.id
 
     # 1. Direct Mention Check (Stay in your lane)
-    if 'niyati' in user_message.lower() and 'kavya' not in user_message.lower():
-        return # Ignore if user is only calling Niyati
+    if persona.is_addressed_elsewhere(user_message):
+        return # Ignore if user is only calling a sister persona
 
-    # 2. Collision Lock (If it's a generic message, decide who speaks)
+    # 2. Collision Lock (If another persona is already answering, stay quiet)
     if is_group:
-        if group_speaker_lock.get(chat.id, {}).get(message.message_id) == "Niyati":
-            return # Niyati is already answering this, Kavya stays quiet
-        
-        # Claim the lock if no one has it and it's an odd message ID (Kavya's turn)
-        if message.message_id % 2 != 0:
-            group_speaker_lock[chat.id] = {message.message_id: "Kavya"}
-        elif not should_respond: # If it's not a direct reply/mention, ignore
+        holder = group_speaker_lock.get(chat.id, {}).get(message.message_id)
+        if holder and holder != persona.name:
             return
     
-    # ========== ANTI-SPAM CHECK ==========
-    if ContentFilter.detect_spam_link(user_message):
+    # ========== CONTENT SCAN (spam / sensitive / distress, one pass) ==========
+    verdict = ContentFilter.scan(user_message)
+    if verdict == ContentFilter.SPAM:
         logger.info(f"🚫 Spam link detected from {user.id}")
         return
 
@@ -2768,22 +5558,24 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         if not user_message.strip():
             return
         
-        await db.get_or_create_group(chat.id, chat.title)
+        # Claim the turn right before answering (no await in between)
+        if not claim_group_turn(chat.id, message.message_id, persona.name):
+            return
+        
+        await db.get_or_create_group(chat.id, chat.title, persona=persona.scope)
 
     if is_private:
         await db.get_or_create_user(user.id, user.first_name, user.username)
 
     # ========== DISTRESS CHECK ==========
-    msg_lower = user_message.lower()
-    for keyword in ContentFilter.DISTRESS_KEYWORDS:
-        if keyword in msg_lower:
-            await message.reply_text(
-                "Hey, main tumhare saath hoon. 💛\n"
-                "Agar kuch bura feel ho raha hai, please iCall helpline pe call karo: "
-                "<b>9152987821</b>\nYa AASRA: <b>9820466726</b>",
-                parse_mode=ParseMode.HTML
-            )
-            return
+    if verdict == ContentFilter.DISTRESS:
+        await message.reply_text(
+            "Hey, main tumhare saath hoon. 💛\n"
+            "Agar kuch bura feel ho raha hai, please iCall helpline pe call karo: "
+            "<b>9152987821</b>\nYa AASRA: <b>9820466726</b>",
+            parse_mode=ParseMode.HTML
+        )
+        return
 
     # ========== AI RESPONSE ==========
     try:
@@ -2791,16 +5583,19 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
             chat_id=chat.id, action=ChatAction.TYPING
         )
 
-        context_msgs = await db.get_user_context(user.id) if is_private else []
+        context_msgs = await db.get_user_context(user.id, persona=persona.scope) if is_private else []
         mood = Mood.get_random_mood()
         time_period = TimeAware.get_time_period()
         
+        # Individual context + what sister personas said in this group
+        shared_context = get_shared_context(chat.id, persona.name) if is_group else []
+        
         # Set current user ID for memory access
-        kavya_ai._current_user_id = user.id
+        ai._current_user_id = user.id
         
-        responses = await kavya_ai.generate_response(
+        responses = await ai.generate_response(
             user_message=user_message,
-            context=context_msgs,
+            context=context_msgs + shared_context,
             user_name=user.first_name,
             is_group=is_group,
             mood=mood,
@@ -2808,22 +5603,9 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
             user_id=user.id
         )
 
-        # Get individual context + shared context
-        bot_context = await db.get_user_context(user.id) if is_private else []
-        shared_context = shared_group_memory.get(chat.id, []) if is_group else []
-        
-        combined_context = bot_context + shared_context # Combine them
-
-        responses = await kavya_ai.generate_response( # (Use niyati_ai for Niyati)
-            user_message=user_message,
-            context=combined_context, # Use combined context here
-            # ... other params
-        )
-
-        # AFTER sending the message successfully, save it to the shared brain
+        # Save it to the shared brain so sister personas see it
         if is_group and responses:
-            await add_to_shared_memory(chat.id, "Kavya", " ".join(responses)) 
-            # (Use "Niyati" in Niyati's function)
+            await add_to_shared_memory(chat.id, persona.name, " ".join(responses))
         
         # Clean responses
         safe_responses = []
@@ -2846,6 +5628,16 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 return
             db.record_group_response(chat.id, responses[0])
         
+        # ========== VOICE PREFETCH (Private Only) ==========
+        # Preference read + synthesis run in the background while the text
+        # is being typed out, so no round trip sits in front of the text
+        voice_task = None
+        if is_private:
+            voice_deadline = monotonic() + Config.VOICE_DEADLINE_SECONDS
+            voice_task = asyncio.create_task(prepare_voice_reply(
+                context.bot.id, user.id, ' '.join(responses), mood, voice=persona.voice
+            ))
+        
         await send_multi_messages(
             context.bot, 
             chat.id, 
@@ -2856,42 +5648,37 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         
         # ========== VOICE REPLY (Private Only) ==========
-        if is_private and responses:
-            prefs = await db.get_user_preferences(user.id)
-            voice_enabled = prefs.get('voice_enabled', False)
-            combined_text = ' '.join(responses)
-            
-            if voice_generator.should_send_voice(
-                combined_text, voice_enabled, is_group=False
-            ):
-                audio = await voice_generator.generate(
-                    combined_text, mood=mood
+        if voice_task:
+            try:
+                voice_text, audio = await asyncio.wait_for(
+                    voice_task, timeout=max(0.0, voice_deadline - monotonic())
                 )
-                if audio:
-                    try:
-                        await context.bot.send_chat_action(
-                            chat_id=chat.id, 
-                            action=ChatAction.RECORD_VOICE
-                        )
-                        await asyncio.sleep(1)
-                        await context.bot.send_voice(
-                            chat_id=chat.id, voice=audio
-                        )
-                    except Exception as e:
-                        logger.debug(f"Voice send error: {e}")
+                if voice_text:
+                    await send_voice_reply(
+                        context.bot, chat.id, voice_text,
+                        mood=mood, voice=persona.voice, audio=audio
+                    )
+            except asyncio.TimeoutError:
+                logger.debug(f"🎤 Voice dropped: not ready within {Config.VOICE_DEADLINE_SECONDS}s")
+            except Exception as e:
+                logger.debug(f"Voice send error: {e}")
         
         # ========== SAVE HISTORY (Private Only) ==========
-        if is_private:
-            await db.save_message(user.id, 'user', user_message)
+        # Messages with passwords/OTPs/card numbers are never persisted
+        if is_private and verdict != ContentFilter.SENSITIVE:
+            await db.save_message(user.id, 'user', user_message, persona=persona.scope)
             combined_response = ' '.join(responses)
-            await db.save_message(user.id, 'assistant', combined_response)
+            await db.save_message(user.id, 'assistant', combined_response, persona=persona.scope)
+            conversation_summarizer.maybe_schedule(user.id, len(context_msgs) + 2, ai)
             
             # ========== DIARY ENTRY (Extract Important Info) ==========
             try:
-                important = await kavya_ai.extract_important_info(
+                important = await ai.extract_important_info(
                     user_message, user.id
                 )
-                if important:
+                if important and persona.scope:
+                    await db.add_persona_memory(user.id, persona.scope, important)
+                elif important:
                     await db.add_diary_entry(user.id, important)
             except Exception as e:
                 logger.debug(f"Diary extract error: {e}")
@@ -2932,7 +5719,7 @@ async def handle_new_member(update: Update, context: ContextTypes.DEFAULT_TYPE):
         mention = f'<a href="tg://user?id={member.id}">{member.first_name}</a>'
         messages = [
             f"Namaste! {mention} ji, aapka swagat hai 🌸",
-            f"Main Kavya hoon, aapki group ki saheli. Koi sahayata chahiye to poochhiyega."
+            f"Main {html.escape(get_persona(context).name)} hoon, aapki group ki saheli. Koi sahayata chahiye to poochhiyega."
         ]
         
         await send_multi_messages(context.bot, chat.id, messages, parse_mode=ParseMode.HTML)
@@ -2960,8 +5747,6 @@ async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def send_locked_diary_card(context: ContextTypes.DEFAULT_TYPE):
     """Send locked diary card at night"""
-    users = await db.get_active_users(days=Config.DIARY_MIN_ACTIVE_DAYS)
-    
     ist = pytz.timezone(Config.DEFAULT_TIMEZONE)
     current_hour = datetime.now(ist).hour
     
@@ -2969,53 +5754,42 @@ async def send_locked_diary_card(context: ContextTypes.DEFAULT_TYPE):
         logger.info(f"⏰ Skipping diary (outside {Config.DIARY_ACTIVE_HOURS} IST)")
         return
     
-    locked_image = "https://images.unsplash.com/photo-1517639493569-5666a7488662?w=600&q=80&blur=50"
-    
-    sent_count = 0
-    skipped_count = 0
+    # One paged query: recently active, reachable, has chatted, diary not disabled
+    users = await db.get_checkin_candidates(
+        Config.DIARY_MIN_ACTIVE_DAYS, 'diary_enabled', require_messages=True
+    )
+    user_ids = [u['user_id'] for u in users if u.get('user_id')]
+    entry_counts = await db.get_todays_diary_counts(user_ids)
+    if len(entry_counts) < len(user_ids):
+        logger.warning(f"⚠️ Skipping {len(user_ids) - len(entry_counts)} diary cards (counts unavailable)")
+        user_ids = [uid for uid in user_ids if uid in entry_counts]
     
-    for user in users:
-        user_id = user.get('user_id')
-        if not user_id: 
-            skipped_count += 1
-            continue
-        
-        prefs = await db.get_user_preferences(user_id)
-        if not prefs.get('diary_enabled', True):
-            skipped_count += 1
-            continue
-        
-        todays_entries = await db.get_todays_diary(user_id)
-        user_context = await db.get_user_context(user_id)
-        
-        if not todays_entries and not user_context:
-            skipped_count += 1
-            continue
-        
+    today_label = datetime.now(ist).strftime('%d %b, %Y')
+
+    async def send(user_id: int):
         keyboard = [[InlineKeyboardButton("✨ Unlock Memory ✨", callback_data=f"unlock_diary_{user_id}")]]
         reply_markup = InlineKeyboardMarkup(keyboard)
-
+        
+        count = entry_counts[user_id]
+        title = f"{count} Secret Memories Created!" if count > 1 else "Secret Memory Created!"
         caption = (
-            "🔒 <b>Secret Memory Created!</b>\n\n"
-            f"Kavya ki Diary - {datetime.now(ist).strftime('%d %b, %Y')}\n"
+            f"🔒 <b>{title}</b>\n\n"
+            f"Kavya ki Diary - {today_label}\n"
             "Card unlock karne ke liye tap karein..."
         )
-
-        try:
-            await context.bot.send_photo(
-                chat_id=user_id,
-                photo=locked_image,
-                caption=caption,
-                reply_markup=reply_markup,
-                parse_mode=ParseMode.HTML
-            )
-            sent_count += 1
-            await asyncio.sleep(0.5)
-        except Exception as e:
-            logger.error(f"Failed to send diary card to {user_id}: {e}")
-            skipped_count += 1
+        
+        await media_registry.send_photo(
+            context.bot, 'diary_locked', user_id,
+            caption=caption,
+            reply_markup=reply_markup,
+            parse_mode=ParseMode.HTML
+        )
     
-    logger.info(f"🔒 Locked Diary Cards sent to {sent_count} users, skipped {skipped_count}")
+    report = await broadcast_engine.fan_out(context.bot.id, user_ids, send)
+    logger.info(
+        f"🔒 Locked Diary Cards sent to {report['sent']}/{len(user_ids)} users "
+        f"in {report['elapsed']}s (blocked: {report['forbidden']}, failed: {report['failed']})"
+    )
 
 
 async def diary_unlock_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -3067,7 +5841,9 @@ async def diary_unlock_callback(update: Update, context: ContextTypes.DEFAULT_TY
         {"role": "user", "content": f"Today's chat: {str(history)}\nMemories: {diary_text}"}
     ]
     
-    ai_diary_text = await kavya_ai._call_gpt(prompt, max_tokens=150)
+    ai_diary_text = response_pipeline.clean(
+        await kavya_ai._call_gpt(prompt, max_tokens=150), user.first_name, kavya_ai.character.name
+    )
     
     if ai_diary_text and len(ai_diary_text) > 20:
         final_diary = ai_diary_text
@@ -3086,11 +5862,7 @@ async def diary_unlock_callback(update: Update, context: ContextTypes.DEFAULT_TY
     # Edit message with unlocked diary
     try:
         if query.message:
-            unlocked_image = "https://images.unsplash.com/photo-1517639493569-5666a7488662?w=800&q=80"
-            
-            await query.edit_message_media(
-                media=InputMediaPhoto(media=unlocked_image, caption=final_caption, parse_mode=ParseMode.HTML)
-            )
+            await media_registry.edit_media(context.bot, query, 'diary_unlocked', final_caption)
     except Exception as e:
         logger.error(f"Diary unlock media edit failed: {e}")
         # Fallback: just send new message
@@ -3134,8 +5906,14 @@ async def start_button_callback(update: Update, context: ContextTypes.DEFAULT_TY
     """Handle start menu button clicks"""
     query = update.callback_query
     await query.answer()
+    persona = get_persona(context)
+    
+    if query.data == 'about_me' and not persona.primary:
+        await query.edit_message_caption(
+            caption=persona_about_text(persona), parse_mode=ParseMode.HTML
+        )
     
-    if query.data == 'about_me':
+    elif query.data == 'about_me':
         about_text = """
 🌸 <b>About Kavya</b> 🌸
 
@@ -3159,22 +5937,8 @@ Mujhe baaton mein gehrai pasand hai, aur main aapki baat sunne mein vishwas kart
         )
     
     elif query.data == 'help':
-        help_text = """
-✨ <b>Kavya se kaise baat karein:</b>
-
-• /start - Start fresh
-• /help - Help menu
-• /mood - Aaj ka mood
-• /forget - Memory clear
-• /voice on/off - 🎤 Voice toggle
-• /say [text] - Text to voice
-• /diary on/off - Secret diary
-
-Seedhe message bhejo, main reply karungi! 💫
-Group mein @mention karo ya reply do.
-"""
         await query.edit_message_caption(
-            caption=help_text, parse_mode=ParseMode.HTML
+            caption=persona_help_text(persona, short=True), parse_mode=ParseMode.HTML
         )
 
 # ============================================================================
@@ -3188,59 +5952,42 @@ async def routine_message_job(context: ContextTypes.DEFAULT_TYPE):
     current_hour = datetime.now(ist).hour
 
     # DND Check
-    if job_data == 'random' and (current_hour >= 23 or current_hour < 8):
+    dnd_start, dnd_end = Config.ROUTINE_DND_HOURS
+    if current_hour >= dnd_start or current_hour < dnd_end:
         return
 
-    users = await db.get_all_users()
+    # Recency + reachability are filtered by the DB; opt-outs from the same rows
+    users = await db.get_checkin_candidates(Config.ROUTINE_ACTIVE_DAYS, 'routine_enabled')
+    targets = [u['user_id'] for u in users if u.get('user_id')]
+    if job_data == 'random':
+        targets = [uid for uid in targets if random.random() < Config.ROUTINE_RANDOM_FRACTION]
     
     morning_texts = ["Shubh Prabhat! ☀️ Din ka shubh aarambh.", "Uth gaye? Subah ki tazgi mehsoos karein.", "Good morning! Kya plan hai aaj?"]
     night_texts = ["Shubh Ratri. 🌙 Soch samet lijiye.", "Neend aane se pehle, accha sochiye.", "Kal naye din ki shuruvat, shanti se so jaiye."]
     random_texts = ["Kya chal raha hai aajkal?", "Aaj ka din kaisa raha?", "Kuch naya likha aapne?"]
+    texts = {'morning': morning_texts, 'night': night_texts}.get(job_data, random_texts)
 
-    count = 0
-    for user in users:
-        user_id = user.get('user_id')
-        if not user_id: continue
-
-        if job_data == 'random' and random.random() > 0.3: 
-            continue
-
-        last_activity = user.get('last_activity', '')
-        if last_activity:
-            try:
-                last_time = datetime.fromisoformat(
-                    last_activity.replace('Z', '+00:00')
-                )
-                if (datetime.now(timezone.utc) - last_time).days > 2:
-                    continue
-            except:
-                pass
-
-        final_msg = ""
-        
-        if job_data == 'morning': final_msg = random.choice(morning_texts)
-        elif job_data == 'night': final_msg = random.choice(night_texts)
-        elif job_data == 'random': final_msg = random.choice(random_texts)
-
-        try:
-            await asyncio.sleep(random.uniform(0.5, 2.0))
-            await context.bot.send_message(chat_id=user_id, text=final_msg)
-            count += 1
-        except Exception as e:
-            logger.error(f"Routine msg failed for {user_id}: {e}")
-        
-        if count > 100:
-            break
+    async def send(user_id: int):
+        await context.bot.send_message(chat_id=user_id, text=random.choice(texts))
 
-    logger.info(f"Routine Job ({job_data}) sent to {count} users.")
+    report = await broadcast_engine.fan_out(context.bot.id, targets, send)
+    logger.info(
+        f"Routine Job ({job_data}) sent to {report['sent']}/{len(targets)} users "
+        f"in {report['elapsed']}s (blocked: {report['forbidden']}, failed: {report['failed']})"
+    )
 
 
 # ============================================================================
 # BOT SETUP & JOB SCHEDULING
 # ============================================================================
 
-def setup_handlers(app: Application):
-    """Register all handlers"""
+def setup_handlers(app: Application, primary: bool = True):
+    """Register all handlers
+    
+    Diary, check-ins, group settings and the group welcome belong to the
+    primary persona (its jobs use them), so secondary bots skip them and a
+    shared group isn't answered or welcomed twice.
+    """
     
     # Private commands
     app.add_handler(CommandHandler("start", start_command))
@@ -3250,7 +5997,9 @@ def setup_handlers(app: Application):
     app.add_handler(CommandHandler("forget", forget_command))
     app.add_handler(CommandHandler("meme", meme_command))
     app.add_handler(CommandHandler("shayari", shayari_command))
-    app.add_handler(CommandHandler("diary", diary_command))
+    if primary:
+        app.add_handler(CommandHandler("diary", diary_command))
+        app.add_handler(CommandHandler("checkin", checkin_command))
     app.add_handler(CommandHandler("stats", user_stats_command))
 
     # VOICE COMMANDS
@@ -3259,26 +6008,33 @@ def setup_handlers(app: Application):
     app.add_handler(CommandHandler("voices", voices_command))  # Admin only
     
     # Admin group commands
-    app.add_handler(CommandHandler("setgeeta", setgeeta_command))
-    app.add_handler(CommandHandler("setwelcome", setwelcome_command))
-    app.add_handler(CommandHandler("groupstats", groupstats_command))
-    app.add_handler(CommandHandler("groupsettings", groupsettings_command))
-    app.add_handler(CommandHandler("grouphelp", grouphelp_command))
-    app.add_handler(CommandHandler("groupinfo", groupinfo_command))
+    if primary:
+        app.add_handler(CommandHandler("setgeeta", setgeeta_command))
+        app.add_handler(CommandHandler("setwelcome", setwelcome_command))
+        app.add_handler(CommandHandler("groupstats", groupstats_command))
+        app.add_handler(CommandHandler("groupsettings", groupsettings_command))
+        app.add_handler(CommandHandler("grouphelp", grouphelp_command))
+        app.add_handler(CommandHandler("groupinfo", groupinfo_command))
 
     # Admin private commands
     app.add_handler(CommandHandler("adminstats", admin_stats_command))
     app.add_handler(CommandHandler("users", users_command))
     app.add_handler(CommandHandler("broadcast", broadcast_command))
+    app.add_handler(CommandHandler("bcstatus", bcstatus_command))
+    app.add_handler(CommandHandler("bcpause", bcpause_command))
+    app.add_handler(CommandHandler("bcresume", bcresume_command))
+    app.add_handler(CommandHandler("reloadlore", reloadlore_command))
     app.add_handler(CommandHandler("adminhelp", adminhelp_command))
     
     # Diary callback
-    app.add_handler(CallbackQueryHandler(diary_unlock_callback, pattern="^unlock_diary_"))
+    if primary:
+        app.add_handler(CallbackQueryHandler(diary_unlock_callback, pattern="^unlock_diary_"))
 
     app.add_handler(CallbackQueryHandler(start_button_callback))
 
     # Message Handlers
-    app.add_handler(MessageHandler(filters.StatusUpdate.NEW_CHAT_MEMBERS, handle_new_member))
+    if primary:
+        app.add_handler(MessageHandler(filters.StatusUpdate.NEW_CHAT_MEMBERS, handle_new_member))
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
 
     # Error Handler
@@ -3289,16 +6045,26 @@ def setup_handlers(app: Application):
 # POST_SHUTDOWN & POST_INIT
 # ============================================================================
 
+async def post_stop(application: Application):
+    """Checkpoint broadcasts while the bot can still talk to Telegram"""
+    await broadcast_engine.shutdown()
+
 async def post_shutdown(application: Application):
     """Bot shutdown cleanup"""
     await health_server.stop()
+    await content_pool.save()
+    telegram_file_ids.save()
     await db.close()
     logger.info("😴 Kavya Bot Stopped.")
 
 async def post_init(application: Application):
     """Initialize DB and Schedule Jobs"""
+    sync_persona_username(application)  # Single-persona run_polling path
     await db.initialize()
+    await content_pool.load()
     await health_server.start()
+    # Network fetch - never hold up job scheduling or polling for it
+    asyncio.create_task(voice_generator.validate_voices([p.voice for p in PERSONAS if p.voice]))
     
     job_queue = application.job_queue
     
@@ -3351,26 +6117,106 @@ async def post_init(application: Application):
         name='cleanup'
     )
 
+    # 7. Content Pool Refill (shayari / Geeta in idle periods)
+    job_queue.run_repeating(
+        content_pool_job,
+        interval=timedelta(seconds=Config.CONTENT_POOL_REFILL_INTERVAL),
+        first=timedelta(seconds=90),
+        name='content_pool_refill'
+    )
+
+    # 8. World Info hot reload
+    job_queue.run_repeating(
+        world_info_refresh_job,
+        interval=timedelta(seconds=Config.WORLD_INFO_REFRESH_INTERVAL),
+        first=timedelta(seconds=Config.WORLD_INFO_REFRESH_INTERVAL),
+        name='world_info_refresh'
+    )
+
     logger.info("🚀 Kavya Bot Started with SillyTavern AI!")
 
 # ============================================================================
 # MAIN EXECUTION
 # ============================================================================
 
+def sync_persona_username(app: Application):
+    """After initialize(): take the @handle from Telegram if the persona entry had none"""
+    persona = app.bot_data['persona']
+    if not persona.username and app.bot.username:
+        persona.username = app.bot.username
+        ContentFilter.allow_username(persona.username)
+
+
+def build_persona_app(persona: Persona, ai: KavyaAI, primary: bool) -> Application:
+    """One Telegram Application per bot token; DB, Groq pool and caches are shared"""
+    builder = Application.builder().token(persona.token)
+    if primary:
+        builder = builder.post_init(post_init).post_stop(post_stop).post_shutdown(post_shutdown)
+    app = builder.build()
+    app.bot_data['persona'] = persona
+    app.bot_data['ai'] = ai
+    broadcast_engine.bots[persona.name] = app.bot
+    setup_handlers(app, primary=primary)
+    # Each persona resumes its own checkpointed broadcasts
+    app.job_queue.run_once(broadcast_resume_job, when=15, name='broadcast_resume')
+    return app
+
+
+async def run_personas(apps: List[Application]):
+    """Poll several bots in one event loop; jobs run on the primary app only"""
+    primary = apps[0]
+    stop_event = asyncio.Event()
+    
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows: KeyboardInterrupt ends the loop instead
+    
+    for app in apps:
+        await app.initialize()
+        sync_persona_username(app)
+    await post_init(primary)
+    
+    try:
+        for app in apps:
+            await app.start()
+            await app.updater.start_polling(drop_pending_updates=True)
+            logger.info(f"🤖 Persona online: {app.bot_data['persona'].name} (@{app.bot.username})")
+        await stop_event.wait()
+    finally:
+        await broadcast_engine.shutdown()
+        for app in apps:
+            try:
+                if app.updater.running:
+                    await app.updater.stop()
+                if app.running:
+                    await app.stop()
+                await app.shutdown()
+            except Exception as e:
+                logger.error(f"Persona shutdown error: {e}")
+        await post_shutdown(primary)
+
+
 def main():
     """Main entry point"""
     if not Config.TELEGRAM_BOT_TOKEN:
         logger.error("❌ Error: TELEGRAM_BOT_TOKEN nahi mila! .env file check karo.")
         return
 
-    app = Application.builder().token(Config.TELEGRAM_BOT_TOKEN).post_init(post_init).post_shutdown(post_shutdown).build()
-
-    # Setup Handlers
-    setup_handlers(app)
+    apps = []
+    for i, persona in enumerate(PERSONAS):
+        ai = kavya_ai if i == 0 else KavyaAI(persona.card_path)
+        ai.scope = persona.scope
+        apps.append(build_persona_app(persona, ai, primary=(i == 0)))
 
     # Start Polling
-    logger.info("⏳ Initializing Bot...")
-    app.run_polling(drop_pending_updates=True)
+    logger.info(f"⏳ Initializing Bot... ({len(apps)} persona(s))")
+    if len(apps) == 1:
+        apps[0].run_polling(drop_pending_updates=True)
+    else:
+        asyncio.run(run_personas(apps))
 
 if __name__ == "__main__":
     try:
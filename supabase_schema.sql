@@ -0,0 +1,73 @@
+-- Kavya bot - Supabase schema additions
+-- Run once in the Supabase SQL editor. Every statement is idempotent, so
+-- the file can be re-run after pulling new changes.
+
+-- ============================================================================
+-- Reachability (blocked / kicked chats are skipped by broadcasts and jobs)
+-- ============================================================================
+
+ALTER TABLE users  ADD COLUMN IF NOT EXISTS unreachable_at TIMESTAMPTZ;
+ALTER TABLE groups ADD COLUMN IF NOT EXISTS unreachable_at TIMESTAMPTZ;
+
+-- ============================================================================
+-- World info hot-reload (refresh fetches rows with updated_at > last seen)
+-- ============================================================================
+
+ALTER TABLE world_info ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ DEFAULT NOW();
+
+CREATE OR REPLACE FUNCTION world_info_touch() RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at = NOW();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS world_info_touch ON world_info;
+CREATE TRIGGER world_info_touch
+    BEFORE INSERT OR UPDATE ON world_info
+    FOR EACH ROW EXECUTE FUNCTION world_info_touch();
+
+-- ============================================================================
+-- Per-persona chat state (secondary personas; the primary uses users)
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS persona_chats (
+    user_id    BIGINT NOT NULL,
+    persona    TEXT   NOT NULL,
+    messages   TEXT   DEFAULT '[]',
+    summary    TEXT   DEFAULT '',
+    memories   TEXT   DEFAULT '[]',
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (user_id, persona)
+);
+
+-- ============================================================================
+-- Broadcast jobs (full row written once, then progress columns patched)
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS broadcast_jobs (
+    job_id            TEXT PRIMARY KEY,
+    persona           TEXT,
+    message           JSONB,
+    targets           JSONB,
+    status_chat_id    BIGINT,
+    status_message_id BIGINT,
+    state             TEXT,
+    results           JSONB,
+    "cursor"          INTEGER DEFAULT 0,
+    report            JSONB,
+    created_at        TIMESTAMPTZ DEFAULT NOW(),
+    updated_at        TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS broadcast_jobs_created_at ON broadcast_jobs (created_at DESC);
+
+-- ============================================================================
+-- Pre-generated content pool (one row per pool key)
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS content_pool (
+    key        TEXT PRIMARY KEY,
+    items      TEXT DEFAULT '[]',
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
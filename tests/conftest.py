@@ -0,0 +1,29 @@
+import importlib.util
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# The bot validates these at import time; tests never talk to Telegram or Groq
+os.environ.setdefault('TELEGRAM_BOT_TOKEN', '123456:test-token')
+os.environ.setdefault('GROQ_API_KEYS', 'test-key')
+os.environ.pop('SUPABASE_URL', None)
+os.environ.pop('SUPABASE_KEY', None)
+
+# Caches (tts_cache/, *.json, the log file) are created relative to the cwd
+os.chdir(tempfile.mkdtemp(prefix='kavya-tests-'))
+
+_spec = importlib.util.spec_from_file_location('kavya_main', ROOT / 'kavyaBot main.py')
+kavya_main = importlib.util.module_from_spec(_spec)
+sys.modules['kavya_main'] = kavya_main
+_spec.loader.exec_module(kavya_main)
+
+
+@pytest.fixture(scope='session')
+def kavya():
+    """The bot module ("kavyaBot main.py" can't be imported by name)"""
+    return kavya_main
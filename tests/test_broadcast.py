@@ -0,0 +1,138 @@
+import asyncio
+
+import pytest
+from telegram.error import RetryAfter
+
+
+def test_token_bucket_bursts_then_paces(kavya):
+    async def scenario():
+        bucket = kavya.TokenBucket(rate=50, capacity=5)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        for _ in range(5):
+            await bucket.acquire()
+        burst = loop.time() - start
+        for _ in range(5):
+            await bucket.acquire()
+        return burst, loop.time() - start
+
+    burst, total = asyncio.run(scenario())
+    assert burst < 0.05
+    assert total >= 0.08  # 5 more tokens at 50/s
+
+
+def test_token_bucket_pause_holds_acquire(kavya):
+    async def scenario():
+        bucket = kavya.TokenBucket(rate=100)
+        bucket.pause(0.1)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await bucket.acquire()
+        return loop.time() - start
+
+    assert asyncio.run(scenario()) >= 0.09
+
+
+def test_job_cursor_advances_over_contiguous_results(kavya):
+    job = kavya.BroadcastJob.create('Kavya', {'text': 'hi'}, [1, 2, 3, 2, 4])
+
+    assert job.targets == [1, 2, 3, 4]
+    job.record(2, 'sent')
+    assert job.cursor == 0 and job.results == {2: 'sent'}
+    job.record(1, 'forbidden')
+    assert job.cursor == 2 and job.results == {}
+    job.record(4, 'failed')
+    assert job.pending() == [3]
+    assert job.done_count == 3
+    assert job.report['sent'] == job.report['forbidden'] == job.report['failed'] == 1
+
+
+def test_job_ids_are_unique(kavya):
+    ids = {kavya.BroadcastJob.create('Kavya', {}, []).job_id for _ in range(50)}
+    assert len(ids) == 50
+
+
+def test_job_row_round_trip(kavya):
+    job = kavya.BroadcastJob.create('Kavya', {'text': 'hi'}, [10, 20, 30, -40],
+                                    status_chat_id=99, status_message_id=7)
+    job.record(10, 'sent')
+    job.record(30, 'failed')
+    job.state = 'paused'
+
+    row = job.to_row()
+    # DB rows come back with string keys for the results map
+    assert row['results'] == {'30': 'failed'}
+    restored = kavya.BroadcastJob.from_row(row)
+
+    assert restored.job_id == job.job_id
+    assert restored.targets == [10, 20, 30, -40]
+    assert restored.cursor == 1
+    assert restored.results == {30: 'failed'}
+    assert restored.pending() == [20, -40]
+    assert restored.report == job.report
+    assert restored.state == 'paused'
+    assert restored.saved and not restored.dirty
+
+
+def test_progress_row_omits_static_columns(kavya):
+    row = kavya.BroadcastJob.create('Kavya', {'text': 'hi'}, [1, 2]).progress_row()
+
+    assert set(row) == {'state', 'results', 'cursor', 'report', 'updated_at'}
+
+
+def test_from_row_drops_results_behind_the_cursor(kavya):
+    row = kavya.BroadcastJob.create('Kavya', {}, [1, 2, 3]).to_row()
+    row.update(cursor=2, results={'1': 'sent', '3': 'sent'})
+
+    assert kavya.BroadcastJob.from_row(row).results == {3: 'sent'}
+
+
+@pytest.fixture
+def fast_broadcast(kavya, monkeypatch):
+    monkeypatch.setattr(kavya.Config, 'BROADCAST_PER_CHAT_INTERVAL', 0)
+    monkeypatch.setattr(kavya.Config, 'BROADCAST_GLOBAL_RATE', 1000)
+    monkeypatch.setattr(kavya.Config, 'BROADCAST_GROUP_RATE', 1000)
+    monkeypatch.setattr(kavya.Config, 'BROADCAST_PROGRESS_INTERVAL', 60)
+    return kavya.BroadcastEngine()
+
+
+def test_flood_wait_pauses_only_the_bot_that_got_it(kavya, fast_broadcast):
+    engine = fast_broadcast
+    flooded = []
+
+    async def send_a(chat_id):
+        if not flooded:
+            flooded.append(chat_id)
+            raise RetryAfter(30)
+
+    async def send_b(chat_id):
+        pass
+
+    async def scenario():
+        task_a = asyncio.create_task(engine.fan_out(1, [11, 12], send_a))
+        await asyncio.sleep(0.05)
+        report_b = await asyncio.wait_for(engine.fan_out(2, [21, 22, 23], send_b), timeout=2)
+        paused_a = engine.buckets[1][0].paused_until > engine.buckets[2][0].paused_until
+        task_a.cancel()
+        await asyncio.gather(task_a, return_exceptions=True)
+        return report_b, paused_a
+
+    report_b, paused_a = asyncio.run(scenario())
+    assert report_b['sent'] == 3
+    assert paused_a
+
+
+def test_fan_out_counts_results(kavya, fast_broadcast):
+    from telegram.error import BadRequest, Forbidden
+
+    async def send(chat_id):
+        if chat_id == 2:
+            raise Forbidden("blocked")
+        if chat_id == 3:
+            raise BadRequest("chat not found")
+
+    report = asyncio.run(fast_broadcast.fan_out(1, [1, 2, 3, 4], send))
+
+    assert (report['sent'], report['forbidden'], report['failed']) == (2, 1, 1)
+    assert kavya.db.is_unreachable(2)
+    kavya.db.unreachable_chats.discard(2)
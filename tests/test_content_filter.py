@@ -0,0 +1,34 @@
+import pytest
+
+
+@pytest.mark.parametrize('text, verdict', [
+    ("Aaj mausam accha hai", 'clean'),
+    ("", 'clean'),
+    ("mera otp 4455 hai", 'sensitive'),
+    ("card 1234567812345678", 'sensitive'),
+    ("join https://t.me/+AbCdEf", 'spam'),
+    ("follow @CryptoDeals now", 'spam'),
+    ("see https://t.me/freemoney", 'spam'),
+    ("I want to die", 'distress'),
+    ("otp de do, warna I want to die", 'distress'),
+    ("otp bhejo aur @CryptoDeals join karo", 'spam'),
+])
+def test_scan_verdicts(kavya, text, verdict):
+    assert kavya.ContentFilter.scan(text) == verdict
+
+
+def test_own_bots_may_be_mentioned(kavya):
+    own = kavya.Config.BOT_USERNAME
+
+    assert kavya.ContentFilter.scan(f"@{own} se baat karo") == 'clean'
+    assert kavya.ContentFilter.scan(f"https://t.me/{own}") == 'clean'
+    assert kavya.ContentFilter.detect_spam_link(f"@{own} aur @SpamChannel")
+
+
+def test_allow_username_whitelists_learned_handles(kavya, monkeypatch):
+    monkeypatch.setattr(kavya.ContentFilter, 'ALLOWED_USERNAMES', kavya.ContentFilter.ALLOWED_USERNAMES)
+    assert kavya.ContentFilter.scan("@MeeraPersonaBot") == 'spam'
+
+    kavya.ContentFilter.allow_username('@MeeraPersonaBot')
+
+    assert kavya.ContentFilter.scan("@MeeraPersonaBot") == 'clean'
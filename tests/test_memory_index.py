@@ -0,0 +1,59 @@
+def test_bm25_ranks_the_most_relevant_doc_first(kavya):
+    index = kavya.UserMemoryIndex()
+    index.add('a', "Exam kal hai, physics ka paper")
+    index.add('b', "Physics physics physics exam stress")
+    index.add('c', "Mummy ka birthday next week")
+
+    results = index.search("physics exam", k=3)
+
+    assert [doc_id for _, doc_id, _ in results] == ['b', 'a']
+    assert results[0][0] > results[1][0] > 0
+
+
+def test_bm25_rare_terms_outweigh_common_ones(kavya):
+    index = kavya.UserMemoryIndex()
+    index.add('common', "office office")
+    index.add('rare', "office interview")
+    for i in range(5):
+        index.add(f"filler{i}", "office kaam")
+
+    assert index.search("interview office", k=1)[0][1] == 'rare'
+
+
+def test_stopwords_and_short_tokens_are_dropped(kavya):
+    assert kavya.MemoryIndex.tokenize("Mera exam hai to a B") == ['mera', 'exam']
+
+    index = kavya.UserMemoryIndex()
+    index.add('a', "exam kal")
+    assert index.search("hai to", k=3) == []
+
+
+def test_remove_keeps_document_frequencies_consistent(kavya):
+    index = kavya.UserMemoryIndex()
+    index.add('a', "dog walk")
+    index.add('a', "ignored duplicate")
+    index.add('b', "dog food")
+
+    index.remove('a')
+    index.remove('missing')
+
+    assert index.df == {'dog': 1, 'food': 1}
+    assert index.total_length == 2
+    assert [d for _, d, _ in index.search("walk dog", k=3)] == ['b']
+
+
+def test_memory_index_sync_and_lru(kavya, monkeypatch):
+    monkeypatch.setattr(kavya.Config, 'MEMORY_INDEX_MAX_USERS', 2)
+    memory = kavya.MemoryIndex()
+    memory.build(1, ["likes chai"], [{'content': "went to Goa", 'timestamp': 't1'}])
+
+    memory.sync_memories(1, ["likes coffee"])
+    docs = memory.get(1).docs
+    assert 'memory:likes coffee' in docs and 'memory:likes chai' not in docs
+    assert 'diary:t1' in docs
+
+    memory.build(2, [], [])
+    memory.get(1)  # Touch -> most recent
+    memory.build(3, [], [])
+    assert memory.get(2) is None
+    assert memory.get(1) is not None
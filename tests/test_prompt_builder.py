@@ -0,0 +1,80 @@
+import pytest
+
+
+@pytest.fixture
+def builder(kavya):
+    return kavya.PromptBuilder()
+
+
+def history(n, words=20):
+    return [
+        {'role': 'user' if i % 2 == 0 else 'assistant', 'content': f"turn{i} " + "baat " * words}
+        for i in range(n)
+    ]
+
+
+def build(builder, **kwargs):
+    args = dict(user_name="Ravi", chat_history=[], current_message="Namaste",
+                mood='composed', time_period='evening', world_context='')
+    args.update(kwargs)
+    return builder.build_prompt(**args)
+
+
+def test_generous_budget_keeps_everything_in_order(kavya, builder, monkeypatch):
+    monkeypatch.setattr(kavya.Config, 'PROMPT_INPUT_TOKEN_BUDGET', 100_000)
+    messages = build(builder, chat_history=history(4), memories=["likes chai"],
+                     summary="Talked about exams", world_context="Delhi lore")
+
+    prefix = builder.get_prefix().messages
+    assert messages[:len(prefix)] == [dict(m) for m in prefix]
+    dynamic = messages[len(prefix)]['content']
+    assert "Conversation so far: Talked about exams" in dynamic
+    assert "Active Memories: likes chai" in dynamic
+    assert "Context: Delhi lore" in dynamic
+    assert [m['content'].split()[0] for m in messages[len(prefix) + 1:-1]] == ['turn0', 'turn1', 'turn2', 'turn3']
+    assert messages[-1] == {'role': 'user', 'content': "Namaste"}
+
+
+def test_tight_budget_drops_old_history_before_recent_turns(kavya, builder, monkeypatch):
+    system_cost = kavya.TokenEstimator.estimate_message(builder.get_prefix().messages[0])
+    monkeypatch.setattr(kavya.Config, 'PROMPT_INPUT_TOKEN_BUDGET', system_cost + 100)
+
+    messages = build(builder, chat_history=history(6))
+    kept = [m['content'].split()[0] for m in messages if m['content'].startswith('turn')]
+
+    assert kept == ['turn4', 'turn5']
+    # Example dialogues went before the two most recent turns did
+    assert [m['role'] for m in messages] == ['system', 'system', 'user', 'assistant', 'user']
+    assert messages[-1]['content'] == "Namaste"
+
+
+def test_current_message_is_never_clipped(kavya, builder, monkeypatch):
+    monkeypatch.setattr(kavya.Config, 'PROMPT_INPUT_TOKEN_BUDGET', 10)
+    long_message = "bahut lambi baat " * 500
+
+    messages = build(builder, chat_history=history(3), memories=["m"], summary="s")
+    assert messages[-1]['content'] == "Namaste"
+
+    messages = build(builder, current_message=long_message)
+    assert messages[-1]['content'] == long_message
+
+
+def test_budget_is_respected_when_it_can_be(kavya, builder, monkeypatch):
+    budget = 900
+    monkeypatch.setattr(kavya.Config, 'PROMPT_INPUT_TOKEN_BUDGET', budget)
+
+    messages = build(builder, chat_history=history(10, words=60),
+                     memories=["memory " * 30] * 5, summary="summary " * 80)
+
+    assert kavya.TokenEstimator.estimate_messages(messages) <= budget + 20  # Header separators
+
+
+def test_history_turns_are_truncated_per_message(kavya, builder, monkeypatch):
+    monkeypatch.setattr(kavya.Config, 'PROMPT_INPUT_TOKEN_BUDGET', 100_000)
+    monkeypatch.setattr(kavya.Config, 'PROMPT_MAX_MESSAGE_TOKENS', 10)
+
+    messages = build(builder, chat_history=[{'role': 'user', 'content': "word " * 200}])
+    turn = messages[-2]['content']
+
+    assert turn.endswith("…")
+    assert kavya.TokenEstimator.estimate(turn) <= 12
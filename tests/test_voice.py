@@ -0,0 +1,124 @@
+import asyncio
+
+
+def test_split_chunks_short_text_is_one_chunk(kavya):
+    assert kavya.VoiceGenerator.split_chunks("  Namaste!  ", limit=50) == ["Namaste!"]
+
+
+def test_split_chunks_packs_sentences_up_to_the_limit(kavya):
+    text = "Ek. Do do. Teen teen teen. Char char char char."
+
+    chunks = kavya.VoiceGenerator.split_chunks(text, limit=20)
+
+    assert chunks == ["Ek. Do do.", "Teen teen teen.", "Char char char char."]
+    assert all(len(c) <= 20 for c in chunks)
+    assert " ".join(chunks) == text
+
+
+def test_split_chunks_cuts_overlong_sentences_at_spaces(kavya):
+    text = "alpha beta gamma delta epsilon zeta eta theta"
+
+    chunks = kavya.VoiceGenerator.split_chunks(text, limit=12)
+
+    assert all(len(c) <= 12 for c in chunks)
+    assert " ".join(chunks) == text
+
+
+def test_split_chunks_handles_devanagari_danda(kavya):
+    chunks = kavya.VoiceGenerator.split_chunks("पहला वाक्य। दूसरा वाक्य।", limit=12)
+
+    assert chunks == ["पहला वाक्य।", "दूसरा वाक्य।"]
+
+
+def test_submit_all_returns_parts_in_order(kavya):
+    executor = kavya.TTSExecutor(max_concurrency=2, max_queue=5, queue_timeout=1)
+
+    async def synth(text, delay):
+        await asyncio.sleep(delay)
+        return text.encode()
+
+    parts = asyncio.run(executor.submit_all(synth, [("a", 0.03), ("b", 0.01), ("c", 0.0)]))
+
+    assert parts == [b"a", b"b", b"c"]
+    assert executor.active == 0 and executor.waiting == 0
+
+
+def test_submit_all_rejects_requests_that_cannot_all_be_admitted(kavya):
+    executor = kavya.TTSExecutor(max_concurrency=1, max_queue=1, queue_timeout=1)
+
+    async def synth(text):
+        return b"x"
+
+    assert asyncio.run(executor.submit_all(synth, [("a",), ("b",), ("c",)])) is None
+    assert executor.counters['rejected'] == 1
+
+
+def test_submit_all_cancels_siblings_when_one_part_fails(kavya):
+    executor = kavya.TTSExecutor(max_concurrency=2, max_queue=5, queue_timeout=5)
+    finished = []
+
+    async def synth(text):
+        if text == "bad":
+            return b""
+        await asyncio.sleep(0.5)
+        finished.append(text)
+        return text.encode()
+
+    async def scenario():
+        result = await executor.submit_all(synth, [("slow1",), ("bad",), ("slow2",), ("slow3",)])
+        await asyncio.sleep(0.05)
+        return result
+
+    assert asyncio.run(scenario()) is None
+    assert finished == []
+    assert executor.active == 0 and executor.waiting == 0
+    assert not executor._slots.locked()
+
+
+def test_resolve_uses_catalogue_substitutes(kavya, monkeypatch):
+    voices = kavya.VoiceGenerator(cache_dir='tts-resolve')
+    monkeypatch.setattr(kavya.voice_catalogue, 'by_name', {'hi-IN-AashiNeural': {}})
+    monkeypatch.setattr(kavya.voice_catalogue, 'by_locale', {
+        'hi-IN': [{'ShortName': 'hi-IN-AashiNeural', 'Gender': 'Female'}]
+    })
+    monkeypatch.setattr(kavya.voice_catalogue, 'refresh', lambda: _true())
+
+    asyncio.run(voices.validate_voices(['hi-IN-PersonaNeural']))
+
+    assert voices.resolve()[0] == 'hi-IN-AashiNeural'
+    assert voices.resolve(voice='hi-IN-PersonaNeural')[0] == 'hi-IN-AashiNeural'
+    assert voices.resolve(voice='hi-IN-AashiNeural')[0] == 'hi-IN-AashiNeural'
+
+
+async def _true():
+    return True
+
+
+def test_canned_replies_are_keyed_without_mood(kavya, monkeypatch):
+    monkeypatch.setattr(kavya.Config, 'CANNED_REPLY_REFRESH_CHANCE', 0)
+    cache = kavya.CannedReplyCache()
+    for i in range(kavya.Config.CANNED_REPLY_VARIANTS):
+        cache.put('greeting', 'evening', "Ravi", [f"Namaste Ravi, shaam {i}"], persona='Kavya')
+
+    served = cache.get('greeting', 'evening', "Meera", persona='Kavya')
+
+    assert served[0].startswith("Namaste Meera, shaam")
+    assert cache.get('greeting', 'morning', "Meera", persona='Kavya') is None
+    assert cache.get('greeting', 'evening', "Meera", persona='Meera') is None
+    assert list(cache.variants) == [('Kavya', 'greeting', 'evening')]
+
+
+def test_canned_reply_templating_handles_punctuated_names(kavya):
+    template = kavya.CannedReplyCache.template
+
+    assert template(["Hi Raj., kaise ho Raj.?"], "Raj.") == ["Hi {{user}}, kaise ho {{user}}?"]
+    assert template(["🌸Priya🌸 ji"], "🌸Priya🌸") == ["{{user}} ji"]
+    assert template(["Raj aur Rajesh"], "Raj") == ["{{user}} aur Rajesh"]
+
+
+def test_canned_reply_classify_normalizes(kavya):
+    cache = kavya.CannedReplyCache()
+
+    assert cache.classify("Hiiiii!!") == 'greeting'
+    assert cache.classify("Good Night 🌙") == 'good_night'
+    assert cache.classify("kal exam hai, kya karun?") is None
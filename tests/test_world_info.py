@@ -0,0 +1,47 @@
+def test_keyword_matcher_matches_whole_words_only(kavya):
+    matcher = kavya.KeywordMatcher([{'keys': ['art']}, {'keys': ['delhi']}])
+
+    assert matcher.match("Delhi mein art gallery") == [1, 0]
+    assert matcher.match("article about party") == []
+    assert matcher.match("delhi_metro") == []
+
+
+def test_keyword_matcher_orders_by_priority_then_position(kavya):
+    entries = [
+        {'keys': ['work'], 'priority': 1},
+        {'keys': ['family'], 'priority': 3},
+        {'keys': ['delhi'], 'priority': 1},
+    ]
+    matcher = kavya.KeywordMatcher(entries)
+
+    assert matcher.match("delhi, work aur family") == [1, 2, 0]
+
+
+def test_keyword_matcher_overlapping_and_comma_keys(kavya):
+    entries = [
+        {'keys': 'south delhi, saket'},
+        {'keys': ['delhi']},
+        {'keys': ['south']},
+    ]
+    matcher = kavya.KeywordMatcher(entries)
+
+    assert sorted(matcher.match("Main South Delhi mein rehti hoon")) == [0, 1, 2]
+    assert matcher.match("saket") == [0]
+
+
+def test_keyword_matcher_ignores_bad_priority_and_empty_keys(kavya):
+    matcher = kavya.KeywordMatcher([{'keys': ['', '  ', 'chai'], 'priority': 'high'}])
+
+    assert matcher.priorities == [0]
+    assert matcher.match("chai?") == [0]
+    assert matcher.match("") == []
+
+
+def test_world_info_caps_entries(kavya):
+    info = kavya.WorldInfo([
+        {'keys': ['a1'], 'content': 'one', 'priority': 1},
+        {'keys': ['b2'], 'content': 'two', 'priority': 2},
+        {'keys': ['c3'], 'content': 'three', 'priority': 3},
+    ])
+
+    assert info.get_relevant_info("a1 b2 c3") == "three two"